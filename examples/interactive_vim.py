@@ -76,25 +76,7 @@ def main():
     print("Saving and quitting (:wq)...")
     requests.post(
         f"{args.url}/send_input",
-        json={"session_id": session_id, "input": ":"}
-    )
-    time.sleep(0.2)
-    
-    requests.post(
-        f"{args.url}/send_input",
-        json={"session_id": session_id, "input": "w"}
-    )
-    time.sleep(0.2)
-    
-    requests.post(
-        f"{args.url}/send_input",
-        json={"session_id": session_id, "input": "q"}
-    )
-    time.sleep(0.2)
-    
-    requests.post(
-        f"{args.url}/send_input",
-        json={"session_id": session_id, "input": "\r"}
+        json={"session_id": session_id, "input": ":wq\r"}
     )
     
     # Wait for vim to exit
@@ -20,6 +20,14 @@ class TerminalMCPClient:
             base_url: The base URL of the Terminal MCP Server
         """
         self.base_url = base_url
+        
+        # One HTTP session for every request, so connections are kept alive
+        # and reused instead of being set up again for each call
+        self.http = requests.Session()
+    
+    def close(self):
+        """Close the client's pooled connections."""
+        self.http.close()
     
     def run_command(
         self, 
@@ -54,7 +62,7 @@ class TerminalMCPClient:
         if terminal_emulator:
             payload["terminal_emulator"] = terminal_emulator
         
-        response = requests.post(url, json=payload)
+        response = self.http.post(url, json=payload)
         response.raise_for_status()
         return response.json()
     
@@ -71,7 +79,7 @@ class TerminalMCPClient:
         url = f"{self.base_url}/send_input"
         payload = {"session_id": session_id, "input": input_text}
         
-        response = requests.post(url, json=payload)
+        response = self.http.post(url, json=payload)
         response.raise_for_status()
         return response.json()
     
@@ -91,7 +99,7 @@ class TerminalMCPClient:
         if raw_output is not None:
             params["raw_output"] = str(raw_output).lower()
         
-        response = requests.get(url, params=params)
+        response = self.http.get(url, params=params)
         response.raise_for_status()
         return response.json()
     
@@ -106,7 +114,7 @@ class TerminalMCPClient:
         """
         url = f"{self.base_url}/sessions/{session_id}"
         
-        response = requests.delete(url)
+        response = self.http.delete(url)
         response.raise_for_status()
         return response.json()
     
@@ -118,7 +126,7 @@ class TerminalMCPClient:
         """
         url = f"{self.base_url}/sessions"
         
-        response = requests.get(url)
+        response = self.http.get(url)
         response.raise_for_status()
         return response.json()
 
@@ -242,14 +250,17 @@ def main():
     
     client = TerminalMCPClient(args.url)
     
-    if args.app == "all" or args.app == "htop":
-        run_htop_example(client)
-    
-    if args.app == "all" or args.app == "vim":
-        run_vim_example(client)
-    
-    if args.app == "all" or args.app == "nano":
-        run_nano_example(client)
+    try:
+        if args.app == "all" or args.app == "htop":
+            run_htop_example(client)
+        
+        if args.app == "all" or args.app == "vim":
+            run_vim_example(client)
+        
+        if args.app == "all" or args.app == "nano":
+            run_nano_example(client)
+    finally:
+        client.close()
 
 
 if __name__ == "__main__":
@@ -20,6 +20,14 @@ class TerminalMCPClient:
             base_url: The base URL of the Terminal MCP Server
         """
         self.base_url = base_url
+        
+        # One HTTP session for every request, so connections are kept alive
+        # and reused instead of being set up again for each call
+        self.http = requests.Session()
+    
+    def close(self):
+        """Close the client's pooled connections."""
+        self.http.close()
     
     def run_command(
         self, command: str, timeout: int = 30, session_id: Optional[str] = None
@@ -39,7 +47,7 @@ class TerminalMCPClient:
         if session_id:
             payload["session_id"] = session_id
         
-        response = requests.post(url, json=payload)
+        response = self.http.post(url, json=payload)
         response.raise_for_status()
         return response.json()
     
@@ -56,7 +64,7 @@ class TerminalMCPClient:
         url = f"{self.base_url}/send_input"
         payload = {"session_id": session_id, "input": input_text}
         
-        response = requests.post(url, json=payload)
+        response = self.http.post(url, json=payload)
         response.raise_for_status()
         return response.json()
     
@@ -71,7 +79,7 @@ class TerminalMCPClient:
         """
         url = f"{self.base_url}/sessions/{session_id}"
         
-        response = requests.get(url)
+        response = self.http.get(url)
         response.raise_for_status()
         return response.json()
     
@@ -86,7 +94,7 @@ class TerminalMCPClient:
         """
         url = f"{self.base_url}/sessions/{session_id}"
         
-        response = requests.delete(url)
+        response = self.http.delete(url)
         response.raise_for_status()
         return response.json()
     
@@ -98,7 +106,7 @@ class TerminalMCPClient:
         """
         url = f"{self.base_url}/sessions"
         
-        response = requests.get(url)
+        response = self.http.get(url)
         response.raise_for_status()
         return response.json()
 
@@ -147,6 +155,8 @@ def main():
             client.terminate_session(session_id)
     else:
         print(f"Command exited with code: {response['exit_code']}")
+    
+    client.close()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,8 @@
 """Complete ANSI color and formatting definitions."""
 
+from functools import lru_cache
+from typing import Tuple
+
 # Standard 16 colors (0-15)
 ANSI_COLORS = {
     # Basic colors (0-7)
@@ -63,8 +66,8 @@ ANSI_COLORS = {
     107: '#FFFFFF', # Bright White background
 }
 
-def get_256_color(color_index: int) -> str:
-    """Get color for 256-color palette (0-255)."""
+def _compute_256_color(color_index: int) -> str:
+    """Compute the color for a 256-color palette index."""
     if color_index < 16:
         return ANSI_COLORS.get(color_index, '#C0C0C0')
     elif color_index < 232:
@@ -80,130 +83,156 @@ def get_256_color(color_index: int) -> str:
         gray = min(255, gray)
         return f'#{gray:02x}{gray:02x}{gray:02x}'
 
+# Every 256-color palette entry, indexed by color number
+PALETTE_256 = tuple(_compute_256_color(index) for index in range(256))
+
+def get_256_color(color_index: int) -> str:
+    """Get color for 256-color palette (0-255)."""
+    if color_index < 256:
+        return PALETTE_256[color_index]
+    return _compute_256_color(color_index)
+
+@lru_cache(maxsize=4096)
+def rgb_to_hex(r: int, g: int, b: int) -> str:
+    """Convert RGB values to a hex color.
+    
+    Truecolor output reuses a small set of colors, so each hex string is
+    built once and the same string object is shared by every style using it.
+    """
+    return f'#{r:02x}{g:02x}{b:02x}'
+
 def get_rgb_color(r: int, g: int, b: int) -> str:
     """Get RGB color."""
     r = max(0, min(255, r))
     g = max(0, min(255, g))
     b = max(0, min(255, b))
-    return f'#{r:02x}{g:02x}{b:02x}'
+    return rgb_to_hex(r, g, b)
+
+# Formatting state with every attribute off
+DEFAULT_SGR_STATE = {
+    'fg_color': None,
+    'bg_color': None,
+    'bold': False,
+    'dim': False,
+    'italic': False,
+    'underline': False,
+    'blink': False,
+    'reverse': False,
+    'strikethrough': False,
+    'hidden': False
+}
+
+# SGR codes with a fixed effect, mapped to the state updates they make
+SGR_STATE_UPDATES = {
+    0: DEFAULT_SGR_STATE,
+    1: {'bold': True},
+    2: {'dim': True},
+    3: {'italic': True},
+    4: {'underline': True},
+    5: {'blink': True},
+    6: {'blink': True},
+    7: {'reverse': True},
+    8: {'hidden': True},
+    9: {'strikethrough': True},
+    22: {'bold': False, 'dim': False},
+    23: {'italic': False},
+    24: {'underline': False},
+    25: {'blink': False},
+    27: {'reverse': False},
+    28: {'hidden': False},
+    29: {'strikethrough': False},
+    39: {'fg_color': None},
+    49: {'bg_color': None},
+}
+for _code in range(90, 98):
+    SGR_STATE_UPDATES[_code] = {'fg_color': ANSI_COLORS[_code]}
+for _code in range(100, 108):
+    SGR_STATE_UPDATES[_code] = {'bg_color': ANSI_COLORS[_code]}
+
+# Basic color codes, brightened when bold is set, mapped to (state key, color index)
+SGR_BASIC_COLORS = {}
+for _index in range(8):
+    SGR_BASIC_COLORS[30 + _index] = ('fg_color', _index)
+    SGR_BASIC_COLORS[40 + _index] = ('bg_color', _index)
+
+# Extended color introducers mapped to the state key they set
+SGR_EXTENDED_COLORS = {38: 'fg_color', 48: 'bg_color'}
+
+@lru_cache(maxsize=1024)
+def parse_csi_params(params_str: str, strip_private: bool = False) -> Tuple[int, ...]:
+    """Parse the numeric parameters of a CSI sequence.
+    
+    The same parameter strings recur constantly in terminal output, so the
+    str to int conversion is done once per distinct string.
+    
+    Args:
+        params_str: Text between the CSI introducer and the final byte
+        strip_private: Whether to drop a leading '?' private marker; when
+            False, parameters with the marker count as malformed
+        
+    Returns:
+        Tuple of parameters, with empty parameters as 0, or an empty tuple
+        if there are none or they are malformed
+    """
+    if strip_private:
+        params_str = params_str.lstrip('?')
+    if not params_str:
+        return ()
+    try:
+        return tuple(int(p) if p else 0 for p in params_str.split(';'))
+    except ValueError:
+        return ()
 
 def parse_sgr_params(params_str: str) -> dict:
     """Parse SGR parameters and return formatting state."""
-    if not params_str:
-        params = [0]
-    else:
-        try:
-            params = [int(p) if p else 0 for p in params_str.split(';')]
-        except ValueError:
-            params = [0]
-    
-    state = {
-        'fg_color': None,
-        'bg_color': None,
-        'bold': False,
-        'dim': False,
-        'italic': False,
-        'underline': False,
-        'blink': False,
-        'reverse': False,
-        'strikethrough': False,
-        'hidden': False
-    }
+    return dict(_parse_sgr_params(params_str))
+
+@lru_cache(maxsize=512)
+def _parse_sgr_params(params_str: str) -> tuple:
+    """Parse SGR parameters into formatting state items.
+    
+    Programs emit the same few parameter strings over and over, so results
+    are cached; callers get a fresh dict from parse_sgr_params.
+    """
+    params = parse_csi_params(params_str) or (0,)
+    
+    state = dict(DEFAULT_SGR_STATE)
     
     i = 0
     while i < len(params):
         param = params[i]
         
-        if param == 0:
-            # Reset all
-            state = {k: False if k != 'fg_color' and k != 'bg_color' else None for k in state}
-        elif param == 1:
-            state['bold'] = True
-        elif param == 2:
-            state['dim'] = True
-        elif param == 3:
-            state['italic'] = True
-        elif param == 4:
-            state['underline'] = True
-        elif param == 5 or param == 6:
-            state['blink'] = True
-        elif param == 7:
-            state['reverse'] = True
-        elif param == 8:
-            state['hidden'] = True
-        elif param == 9:
-            state['strikethrough'] = True
-        elif param == 22:
-            state['bold'] = False
-            state['dim'] = False
-        elif param == 23:
-            state['italic'] = False
-        elif param == 24:
-            state['underline'] = False
-        elif param == 25:
-            state['blink'] = False
-        elif param == 27:
-            state['reverse'] = False
-        elif param == 28:
-            state['hidden'] = False
-        elif param == 29:
-            state['strikethrough'] = False
-        elif 30 <= param <= 37:
-            # Standard foreground colors
-            color_idx = param - 30
-            if state['bold']:
-                # Bold + basic color = bright color
-                state['fg_color'] = ANSI_COLORS[color_idx + 8]
-            else:
-                state['fg_color'] = ANSI_COLORS[color_idx]
-        elif param == 38:
-            # Extended foreground color
-            if i + 1 < len(params):
-                if params[i + 1] == 2 and i + 4 < len(params):
-                    # RGB: 38;2;r;g;b
-                    r, g, b = params[i + 2], params[i + 3], params[i + 4]
-                    state['fg_color'] = get_rgb_color(r, g, b)
-                    i += 4
-                elif params[i + 1] == 5 and i + 2 < len(params):
-                    # 256-color: 38;5;n
-                    state['fg_color'] = get_256_color(params[i + 2])
-                    i += 2
-        elif param == 39:
-            # Default foreground
-            state['fg_color'] = None
-        elif 40 <= param <= 47:
-            # Standard background colors
-            color_idx = param - 40
-            if state['bold']:
-                # Bold + basic background = bright background
-                state['bg_color'] = ANSI_COLORS[color_idx + 8]
-            else:
-                state['bg_color'] = ANSI_COLORS[color_idx]
-        elif param == 48:
-            # Extended background color
-            if i + 1 < len(params):
-                if params[i + 1] == 2 and i + 4 < len(params):
-                    # RGB: 48;2;r;g;b
-                    r, g, b = params[i + 2], params[i + 3], params[i + 4]
-                    state['bg_color'] = get_rgb_color(r, g, b)
-                    i += 4
-                elif params[i + 1] == 5 and i + 2 < len(params):
-                    # 256-color: 48;5;n
-                    state['bg_color'] = get_256_color(params[i + 2])
-                    i += 2
-        elif param == 49:
-            # Default background
-            state['bg_color'] = None
-        elif 90 <= param <= 97:
-            # Bright foreground colors
-            state['fg_color'] = ANSI_COLORS[param]
-        elif 100 <= param <= 107:
-            # Bright background colors
-            state['bg_color'] = ANSI_COLORS[param]
+        updates = SGR_STATE_UPDATES.get(param)
+        if updates is not None:
+            state.update(updates)
+        elif param in SGR_BASIC_COLORS:
+            # Bold + basic color = bright color
+            key, color_idx = SGR_BASIC_COLORS[param]
+            state[key] = ANSI_COLORS[color_idx + 8 if state['bold'] else color_idx]
+        elif param in SGR_EXTENDED_COLORS and i + 1 < len(params):
+            key = SGR_EXTENDED_COLORS[param]
+            if params[i + 1] == 2 and i + 4 < len(params):
+                # RGB: 38;2;r;g;b
+                r, g, b = params[i + 2], params[i + 3], params[i + 4]
+                state[key] = get_rgb_color(r, g, b)
+                i += 4
+            elif params[i + 1] == 5 and i + 2 < len(params):
+                # 256-color: 38;5;n
+                state[key] = get_256_color(params[i + 2])
+                i += 2
         
         i += 1
     
-    return state
+    return tuple(state.items())
+
+def escape_html_text(text: str) -> str:
+    """Escape the HTML special characters in terminal text.
+    
+    Chained str.replace calls each scan the text in C, which is much faster
+    than str.translate with a multi-character table on long runs.
+    """
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('"', '&quot;').replace("'", '&#39;'))
 
 def format_css_style(state: dict) -> str:
     """Convert formatting state to CSS style string."""
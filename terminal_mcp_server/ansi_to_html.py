@@ -4,6 +4,16 @@ import re
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
+from terminal_mcp_server.ansi_colors import escape_html_text, get_256_color, parse_csi_params, rgb_to_hex
+
+
+# Control characters dropped from plain text (tabs and line endings are kept)
+CONTROL_CHAR_PATTERN = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def escape_line_text(text: str) -> str:
+    """Escape plain text for HTML, converting tabs to 4 spaces and dropping other control characters."""
+    return CONTROL_CHAR_PATTERN.sub('', escape_html_text(text).replace('\t', '    '))
 
 @dataclass
 class TerminalState:
@@ -50,6 +60,19 @@ class AnsiToHtmlConverter:
     
     def __init__(self):
         """Initialize the converter."""
+        # CSS style per formatting state, kept across conversions
+        self.style_cache: Dict[tuple, str] = {}
+        
+        # CSI handlers keyed by final byte; cursor movement and erasing do
+        # not affect the HTML and are ignored
+        self.csi_handlers = {
+            'm': self.handle_sgr,
+            'H': self.handle_cursor_position,
+            'f': self.handle_cursor_position,
+            's': self.handle_save_cursor,
+            'u': self.handle_restore_cursor,
+        }
+        
         self.reset_state()
     
     def reset_state(self):
@@ -64,23 +87,12 @@ class AnsiToHtmlConverter:
     
     def rgb_to_hex(self, r: int, g: int, b: int) -> str:
         """Convert RGB values to hex color."""
-        return f'#{r:02x}{g:02x}{b:02x}'
+        return rgb_to_hex(r, g, b)
     
     def get_256_color(self, color_index: int) -> str:
         """Get color for 256-color palette."""
-        if color_index < 16:
-            return self.STANDARD_COLORS[color_index]
-        elif color_index < 232:
-            # 216 color cube (6x6x6)
-            color_index -= 16
-            r = (color_index // 36) * 51
-            g = ((color_index % 36) // 6) * 51
-            b = (color_index % 6) * 51
-            return self.rgb_to_hex(r, g, b)
-        else:
-            # 24 grayscale colors
-            gray = 8 + (color_index - 232) * 10
-            return self.rgb_to_hex(gray, gray, gray)
+        # Looked up in the precomputed palette
+        return get_256_color(color_index)
     
     def parse_color(self, params: List[int], is_background: bool = False) -> Optional[str]:
         """Parse color parameters and return hex color."""
@@ -250,44 +262,45 @@ class AnsiToHtmlConverter:
         
         return '; '.join(styles)
     
+    def get_cached_style(self) -> str:
+        """Get the CSS for the current state, computing it once per distinct state."""
+        # Field values in declaration order identify the state
+        key = tuple(vars(self.state).values())
+        style = self.style_cache.get(key)
+        if style is None:
+            style = self.style_cache[key] = self.get_current_style()
+        return style
+    
+    def handle_cursor_position(self, params: List[int]):
+        """Handle cursor positioning (CUP) sequences."""
+        row = params[0] - 1 if params else 0
+        col = params[1] - 1 if len(params) > 1 else 0
+        self.cursor_row = max(0, row)
+        self.cursor_col = max(0, col)
+    
+    def handle_save_cursor(self, params: List[int]):
+        """Handle save cursor position sequences."""
+        self.saved_cursor = (self.cursor_row, self.cursor_col)
+    
+    def handle_restore_cursor(self, params: List[int]):
+        """Handle restore cursor position sequences."""
+        self.cursor_row, self.cursor_col = self.saved_cursor
+    
     def process_csi_sequence(self, params_str: str, command: str):
         """Process CSI (Control Sequence Introducer) sequences."""
-        params = []
-        if params_str:
-            try:
-                params = [int(p) if p else 0 for p in params_str.split(';')]
-            except ValueError:
-                params = []
-        
-        if command == 'm':
-            # SGR - Select Graphic Rendition
-            self.handle_sgr(params)
-        elif command in ['A', 'B', 'C', 'D']:
-            # Cursor movement (we'll ignore for HTML rendering)
-            pass
-        elif command == 'H' or command == 'f':
-            # Cursor position
-            row = params[0] - 1 if params else 0
-            col = params[1] - 1 if len(params) > 1 else 0
-            self.cursor_row = max(0, row)
-            self.cursor_col = max(0, col)
-        elif command == 'J':
-            # Erase display (we'll ignore for HTML rendering)
-            pass
-        elif command == 'K':
-            # Erase line (we'll ignore for HTML rendering)
-            pass
-        elif command == 's':
-            # Save cursor position
-            self.saved_cursor = (self.cursor_row, self.cursor_col)
-        elif command == 'u':
-            # Restore cursor position
-            self.cursor_row, self.cursor_col = self.saved_cursor
+        # Dispatch on the final byte; unknown commands are ignored
+        handler = self.csi_handlers.get(command)
+        if handler:
+            handler(parse_csi_params(params_str))
     
     def convert_to_html(self, text: str, title: str = "Terminal Output") -> str:
         """Convert ANSI text to HTML."""
         self.reset_state()
         
+        # Text without escape sequences only needs escaping
+        if '\x1b' not in text:
+            return self.wrap_html(escape_line_text(text), title)
+        
         # Split text into lines for processing
         lines = text.split('\n')
         html_lines = []
@@ -303,8 +316,11 @@ class AnsiToHtmlConverter:
                 html_lines.append(f'<span style="color: #ff6666">[Error converting line: {str(e)}]</span>{escaped_line}')
         
         # Generate complete HTML document
+        return self.wrap_html('\n'.join(html_lines), title)
+    
+    def wrap_html(self, html_content: str, title: str) -> str:
+        """Wrap converted terminal content in a complete HTML document."""
         css = self.generate_css()
-        html_content = '\n'.join(html_lines)
         
         html = f"""<!DOCTYPE html>
 <html lang="en">
@@ -328,10 +344,31 @@ class AnsiToHtmlConverter:
     def convert_line_to_html(self, line: str) -> str:
         """Convert a single line of ANSI text to HTML."""
         result = []
+        # Style of the open span, and the style for the next text written
         current_style = ""
+        pending_style = ""
         i = 0
         
-        while i < len(line):
+        while True:
+            # Copy the plain text up to the next escape in one pass; back to
+            # back escapes leave nothing to escape
+            esc = line.find('\x1b', i)
+            end = esc if esc >= 0 else len(line)
+            text = escape_line_text(line[i:end]) if end > i else ''
+            if text:
+                # Change spans only when styled text is actually written, so
+                # consecutive SGR sequences produce a single span
+                if pending_style != current_style:
+                    if current_style:
+                        result.append('</span>')
+                    if pending_style:
+                        result.append(f'<span style="{pending_style}">')
+                    current_style = pending_style
+                result.append(text)
+            if esc < 0:
+                break
+            i = esc
+            
             # Look for ANSI escape sequences
             csi_match = self.CSI_PATTERN.match(line, i)
             if csi_match:
@@ -344,14 +381,7 @@ class AnsiToHtmlConverter:
                     pass
                 i = csi_match.end()
                 
-                # Check if style changed
-                new_style = self.get_current_style()
-                if new_style != current_style:
-                    if current_style:
-                        result.append('</span>')
-                    if new_style:
-                        result.append(f'<span style="{new_style}">')
-                    current_style = new_style
+                pending_style = self.get_cached_style()
                 continue
             
             # Look for OSC sequences (title setting, etc.)
@@ -368,26 +398,7 @@ class AnsiToHtmlConverter:
                 i = simple_match.end()
                 continue
             
-            # Regular character
-            char = line[i]
-            if char == '<':
-                result.append('&lt;')
-            elif char == '>':
-                result.append('&gt;')
-            elif char == '&':
-                result.append('&amp;')
-            elif char == '"':
-                result.append('&quot;')
-            elif char == "'":
-                result.append('&#39;')
-            elif char == '\t':
-                result.append('    ')  # Convert tabs to 4 spaces
-            elif ord(char) < 32 and char not in ['\n', '\r']:
-                # Skip other control characters that aren't handled
-                pass
-            else:
-                result.append(char)
-            
+            # Unrecognized escape: drop the ESC like other control characters
             i += 1
         
         # Close any open span
@@ -1,13 +1,38 @@
 """ANSI escape sequence to HTML converter with proper 2D terminal screen handling."""
 
 import re
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Tuple, Optional, Sequence
 
+from terminal_mcp_server.ansi_colors import escape_html_text, get_256_color, parse_csi_params, rgb_to_hex
 
-@dataclass
-class TerminalCell:
-    """Represents a single character cell in the terminal."""
+
+class CellStyle(NamedTuple):
+    """Formatting attributes shared by every cell drawn in the same style.
+    
+    Styles are immutable and interned, so a screen row stores one reference
+    per cell and runs of the same style compare by identity.
+    """
+    fg_color: Optional[str] = None
+    bg_color: Optional[str] = None
+    bold: bool = False
+    dim: bool = False
+    italic: bool = False
+    underline: bool = False
+    strikethrough: bool = False
+    blink: bool = False
+    reverse: bool = False
+    hidden: bool = False
+
+
+class TerminalCell(NamedTuple):
+    """Represents a single character cell in the terminal.
+    
+    The renderer stores characters and styles separately; cells are built on
+    demand for the screen view.
+    """
     char: str = ' '
     fg_color: Optional[str] = None
     bg_color: Optional[str] = None
@@ -21,6 +46,20 @@ class TerminalCell:
     hidden: bool = False
 
 
+# Style of every blank position on the screen
+DEFAULT_STYLE = CellStyle()
+
+# Cell for every blank position on the screen
+BLANK_CELL = TerminalCell()
+
+# Interning factory so every cell written in the same style shares one style
+make_style = lru_cache(maxsize=1024)(CellStyle)
+
+# Printable runs, written to the screen a row segment at a time, and single
+# control characters
+PLAIN_TEXT_PATTERN = re.compile(r'([^\x00-\x1f]+)|[\x00-\x1f]')
+
+
 class Terminal2DRenderer:
     """Renders ANSI escape sequences to HTML with proper 2D terminal layout."""
     
@@ -47,16 +86,58 @@ class Terminal2DRenderer:
     # ANSI escape sequence patterns
     CSI_PATTERN = re.compile(r'\x1b\[([0-9;?]*)([a-zA-Z])')
     
+    # Every escape sequence, so that none reaches process_plain_text: handled
+    # CSI (captured), other CSI, OSC, charset designation, then any other escape
+    ESCAPE_SEQUENCE_PATTERN = re.compile('|'.join([
+        CSI_PATTERN.pattern,
+        r'\x1b\[[0-?]*[ -/]*[@-~]',
+        r'\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)',
+        r'\x1b[()#%*+].',
+        r'\x1b[\s\S]?',
+    ]))
+    
     def __init__(self, width: int = 120, height: int = 40):
         """Initialize the terminal renderer."""
         self.width = width
         self.height = height
+        self.blank_row = ' ' * width
+        
+        # CSS style per cell style, kept across renders
+        self.style_cache: Dict[CellStyle, str] = {}
+        
+        # Style resulting from an SGR sequence's parameters, per starting style
+        self.sgr_transitions: Dict[Tuple[CellStyle, Tuple[int, ...]], CellStyle] = {}
+        
+        # CSI handlers keyed by final byte
+        self.csi_handlers = {
+            'm': self.handle_sgr,
+            'H': self.handle_cursor_position,
+            'f': self.handle_cursor_position,
+            'A': self.handle_cursor_up,
+            'B': self.handle_cursor_down,
+            'C': self.handle_cursor_forward,
+            'D': self.handle_cursor_back,
+        }
+        
         self.reset_terminal()
     
     def reset_terminal(self):
         """Reset the terminal state."""
-        # Create 2D grid of terminal cells
-        self.screen = [[TerminalCell() for _ in range(self.width)] for _ in range(self.height)]
+        # Screen grid as parallel arrays: one string of characters per row and
+        # one list of cell styles per row
+        self.chars = [self.blank_row] * self.height
+        self.styles = [[DEFAULT_STYLE] * self.width for _ in range(self.height)]
+        
+        # Rendered HTML per row, and the rows changed since it was rendered;
+        # every blank row renders the same, so it is rendered only once
+        self.blank_row_html = self.render_row_to_html(0)
+        self.row_html = [self.blank_row_html] * self.height
+        self.dirty_rows = set()
+        
+        # Characters and styles each row's HTML was rendered from, so a row
+        # rewritten with the same content is not rendered again
+        self.blank_row_source = (self.blank_row, [DEFAULT_STYLE] * self.width)
+        self.row_sources = [self.blank_row_source] * self.height
         
         # Current cursor position
         self.cursor_row = 0
@@ -73,27 +154,53 @@ class Terminal2DRenderer:
         self.current_blink = False
         self.current_reverse = False
         self.current_hidden = False
+        self.current_style = DEFAULT_STYLE
+    
+    def cell(self, row: int, col: int) -> TerminalCell:
+        """Get the cell at a screen position.
+        
+        Args:
+            row: Row index
+            col: Column index
+            
+        Returns:
+            The character and its formatting, as an immutable cell
+        """
+        return TerminalCell(self.chars[row][col], *self.styles[row][col])
+    
+    @property
+    def screen(self) -> List[List[TerminalCell]]:
+        """2D grid of terminal cells, built from the character and style rows.
+        
+        Every access builds a new snapshot of the whole screen, and changes
+        made to it are not written back; use cell() to read single positions.
+        """
+        return [
+            [TerminalCell(char, *style) for char, style in zip(chars, styles)]
+            for chars, styles in zip(self.chars, self.styles)
+        ]
     
     def get_256_color(self, color_index: int) -> str:
         """Get color for 256-color palette."""
-        if color_index < 16:
-            return self.STANDARD_COLORS[color_index]
-        elif color_index < 232:
-            # 216 color cube (6x6x6)
-            color_index -= 16
-            r = (color_index // 36) * 51
-            g = ((color_index % 36) // 6) * 51
-            b = (color_index % 6) * 51
-            return f'#{r:02x}{g:02x}{b:02x}'
-        else:
-            # 24 grayscale colors
-            gray = 8 + (color_index - 232) * 10
-            return f'#{gray:02x}{gray:02x}{gray:02x}'
+        # Looked up in the precomputed palette
+        return get_256_color(color_index)
     
-    def handle_sgr(self, params: List[int]):
+    def handle_sgr(self, params: Sequence[int]):
         """Handle Select Graphic Rendition (SGR) escape sequences."""
         if not params:
-            params = [0]
+            params = (0,)
+        
+        # Programs repeat the same few sequences, so the style each parameter
+        # list produces from the current style is cached; a repeated sequence
+        # is then a single lookup instead of walking the codes
+        transition = (self.current_style, params)
+        style = self.sgr_transitions.get(transition)
+        if style is not None:
+            self.current_style = style
+            (self.current_fg, self.current_bg, self.current_bold, self.current_dim,
+             self.current_italic, self.current_underline, self.current_strikethrough,
+             self.current_blink, self.current_reverse, self.current_hidden) = style
+            return
         
         i = 0
         while i < len(params):
@@ -151,7 +258,7 @@ class Terminal2DRenderer:
                     if params[i + 1] == 2 and i + 4 < len(params):
                         # RGB: 38;2;r;g;b
                         r, g, b = params[i + 2], params[i + 3], params[i + 4]
-                        self.current_fg = f'#{r:02x}{g:02x}{b:02x}'
+                        self.current_fg = rgb_to_hex(r, g, b)
                         i += 4
                     elif params[i + 1] == 5 and i + 2 < len(params):
                         # 256-color: 38;5;n
@@ -169,7 +276,7 @@ class Terminal2DRenderer:
                     if params[i + 1] == 2 and i + 4 < len(params):
                         # RGB: 48;2;r;g;b
                         r, g, b = params[i + 2], params[i + 3], params[i + 4]
-                        self.current_bg = f'#{r:02x}{g:02x}{b:02x}'
+                        self.current_bg = rgb_to_hex(r, g, b)
                         i += 4
                     elif params[i + 1] == 5 and i + 2 < len(params):
                         # 256-color: 48;5;n
@@ -186,8 +293,27 @@ class Terminal2DRenderer:
                 self.current_bg = self.STANDARD_COLORS[param - 100 + 8]
             
             i += 1
+        
+        style = make_style(
+            self.current_fg,
+            self.current_bg,
+            self.current_bold,
+            self.current_dim,
+            self.current_italic,
+            self.current_underline,
+            self.current_strikethrough,
+            self.current_blink,
+            self.current_reverse,
+            self.current_hidden,
+        )
+        # Reset text shares the blank style
+        self.current_style = DEFAULT_STYLE if style == DEFAULT_STYLE else style
+        
+        if len(self.sgr_transitions) >= 4096:
+            self.sgr_transitions.clear()
+        self.sgr_transitions[transition] = self.current_style
     
-    def handle_cursor_position(self, params: List[int]):
+    def handle_cursor_position(self, params: Sequence[int]):
         """Handle cursor positioning (CUP) sequences."""
         if not params:
             row, col = 1, 1
@@ -202,94 +328,104 @@ class Terminal2DRenderer:
     
     def put_char(self, char: str):
         """Put a character at the current cursor position with current formatting."""
-        if 0 <= self.cursor_row < self.height and 0 <= self.cursor_col < self.width:
-            cell = self.screen[self.cursor_row][self.cursor_col]
-            cell.char = char
-            cell.fg_color = self.current_fg
-            cell.bg_color = self.current_bg
-            cell.bold = self.current_bold
-            cell.dim = self.current_dim
-            cell.italic = self.current_italic
-            cell.underline = self.current_underline
-            cell.strikethrough = self.current_strikethrough
-            cell.blink = self.current_blink
-            cell.reverse = self.current_reverse
-            cell.hidden = self.current_hidden
+        self.put_text(char)
+    
+    def put_text(self, text: str):
+        """Put printable text at the cursor with current formatting, wrapping at the right margin.
+        
+        Each row segment is written with one string splice and one slice
+        assignment. Text past the bottom row is dropped.
+        """
+        pos = 0
+        length = len(text)
+        while pos < length and 0 <= self.cursor_row < self.height:
+            row = self.cursor_row
+            col = self.cursor_col
+            count = min(length - pos, self.width - col)
+            end = col + count
+            
+            line = self.chars[row]
+            self.chars[row] = line[:col] + text[pos:pos + count] + line[end:]
+            self.styles[row][col:end] = [self.current_style] * count
+            self.dirty_rows.add(row)
+            pos += count
             
             # Advance cursor
-            self.cursor_col += 1
+            self.cursor_col = end
             if self.cursor_col >= self.width:
                 self.cursor_col = 0
                 self.cursor_row += 1
     
     def process_text(self, text: str):
         """Process ANSI text and populate the terminal screen."""
-        i = 0
-        while i < len(text):
-            # Look for ANSI escape sequences
-            match = self.CSI_PATTERN.match(text, i)
-            if match:
-                params_str, command = match.groups()
-                
-                # Parse parameters
-                params = []
-                if params_str:
-                    try:
-                        # Handle parameters with ? prefix
-                        clean_params = params_str.lstrip('?')
-                        if clean_params:
-                            params = [int(p) if p else 0 for p in clean_params.split(';')]
-                    except ValueError:
-                        params = []
-                
-                # Handle different commands
-                if command == 'm':
-                    # SGR - Select Graphic Rendition
-                    self.handle_sgr(params)
-                elif command in ['H', 'f']:
-                    # CUP - Cursor Position
-                    self.handle_cursor_position(params)
-                elif command == 'A':
-                    # CUU - Cursor Up
-                    count = params[0] if params else 1
-                    self.cursor_row = max(0, self.cursor_row - count)
-                elif command == 'B':
-                    # CUD - Cursor Down
-                    count = params[0] if params else 1
-                    self.cursor_row = min(self.height - 1, self.cursor_row + count)
-                elif command == 'C':
-                    # CUF - Cursor Forward
-                    count = params[0] if params else 1
-                    self.cursor_col = min(self.width - 1, self.cursor_col + count)
-                elif command == 'D':
-                    # CUB - Cursor Back
-                    count = params[0] if params else 1
-                    self.cursor_col = max(0, self.cursor_col - count)
-                # Ignore other sequences for now (terminal modes, etc.)
-                
-                i = match.end()
-            else:
-                # Regular character
-                char = text[i]
-                if char == '\r':
-                    # Carriage return - move to beginning of line
-                    self.cursor_col = 0
-                elif char == '\n':
-                    # Line feed - move to next line
-                    self.cursor_row += 1
-                    if self.cursor_row >= self.height:
-                        self.cursor_row = self.height - 1
-                elif char == '\t':
-                    # Tab - advance to next tab stop (every 8 columns)
-                    next_tab = ((self.cursor_col // 8) + 1) * 8
-                    self.cursor_col = min(self.width - 1, next_tab)
-                elif ord(char) >= 32:  # Printable character
-                    self.put_char(char)
-                
-                i += 1
+        pos = 0
+        for match in self.ESCAPE_SEQUENCE_PATTERN.finditer(text):
+            if match.start() > pos:
+                self.process_plain_text(text[pos:match.start()])
+            
+            params_str, command = match.groups()
+            if command:
+                self.handle_csi(params_str, command)
+            # Other escape sequences are consumed without effect
+            
+            pos = match.end()
+        
+        if pos < len(text):
+            self.process_plain_text(text[pos:])
+    
+    def handle_csi(self, params_str: str, command: str):
+        """Handle a CSI sequence."""
+        params = parse_csi_params(params_str, strip_private=True)
+        
+        # Dispatch on the final byte; unknown commands are ignored
+        handler = self.csi_handlers.get(command)
+        if handler:
+            handler(params)
+    
+    def handle_cursor_up(self, params: Sequence[int]):
+        """Handle cursor up (CUU) sequences."""
+        count = params[0] if params else 1
+        self.cursor_row = max(0, self.cursor_row - count)
+    
+    def handle_cursor_down(self, params: Sequence[int]):
+        """Handle cursor down (CUD) sequences."""
+        count = params[0] if params else 1
+        self.cursor_row = min(self.height - 1, self.cursor_row + count)
+    
+    def handle_cursor_forward(self, params: Sequence[int]):
+        """Handle cursor forward (CUF) sequences."""
+        count = params[0] if params else 1
+        self.cursor_col = min(self.width - 1, self.cursor_col + count)
     
-    def get_cell_style(self, cell: TerminalCell) -> str:
-        """Get CSS style string for a terminal cell."""
+    def handle_cursor_back(self, params: Sequence[int]):
+        """Handle cursor back (CUB) sequences."""
+        count = params[0] if params else 1
+        self.cursor_col = max(0, self.cursor_col - count)
+    
+    def process_plain_text(self, text: str):
+        """Process text that contains no escape sequences."""
+        for match in PLAIN_TEXT_PATTERN.finditer(text):
+            run = match.group(1)
+            if run:
+                self.put_text(run)
+                continue
+            
+            char = match.group()
+            if char == '\r':
+                # Carriage return - move to beginning of line
+                self.cursor_col = 0
+            elif char == '\n':
+                # Line feed - move to next line
+                self.cursor_row += 1
+                if self.cursor_row >= self.height:
+                    self.cursor_row = self.height - 1
+            elif char == '\t':
+                # Tab - advance to next tab stop (every 8 columns)
+                next_tab = ((self.cursor_col // 8) + 1) * 8
+                self.cursor_col = min(self.width - 1, next_tab)
+    
+    def get_cell_style(self, cell: CellStyle) -> str:
+        """Get CSS style string for a terminal cell or cell style."""
         styles = []
         
         # Handle reverse video
@@ -359,44 +495,58 @@ class Terminal2DRenderer:
         
         return '; '.join(styles)
     
+    def render_row_to_html(self, row_index: int) -> str:
+        """Render one screen row to HTML, one span per run of identically styled cells."""
+        chars = self.chars[row_index]
+        row_styles = self.styles[row_index]
+        
+        # Blank and single-style rows are a single run; list.count checks
+        # that in C without grouping the cells
+        if row_styles.count(row_styles[0]) == len(row_styles):
+            cell_style = self.get_cached_cell_style(row_styles[0])
+            text = escape_html_text(chars)
+            return f'<span style="{cell_style}">{text}</span>' if cell_style else text
+        
+        # Run-length encode the row on the styles themselves, which compare
+        # field by field in C with identity shortcuts, instead of hashing a
+        # style per cell; CSS is then looked up once per run, and runs whose
+        # styles render the same are merged
+        runs = [(self.get_cached_cell_style(style), len(list(cells))) for style, cells in groupby(row_styles)]
+        
+        line_parts = []
+        start = 0
+        
+        for cell_style, group in groupby(runs, key=itemgetter(0)):
+            end = start + sum(length for _, length in group)
+            text = escape_html_text(chars[start:end])
+            start = end
+            if cell_style:
+                line_parts.append(f'<span style="{cell_style}">{text}</span>')
+            else:
+                line_parts.append(text)
+        
+        return ''.join(line_parts)
+    
+    def get_cached_cell_style(self, style: CellStyle) -> str:
+        """Get the CSS for a cell style, computing it once per distinct style."""
+        cell_style = self.style_cache.get(style)
+        if cell_style is None:
+            cell_style = self.style_cache[style] = self.get_cell_style(style)
+        return cell_style
+    
     def render_to_html(self, title: str = "Terminal Output") -> str:
         """Render the terminal screen to HTML."""
-        html_lines = []
+        # Only rows written since the last render need to be rendered again,
+        # and only if they were not just redrawn with the same content, as
+        # full screen programs do on every refresh
+        for row_index in self.dirty_rows:
+            source = (self.chars[row_index], self.styles[row_index])
+            if source != self.row_sources[row_index]:
+                self.row_html[row_index] = self.render_row_to_html(row_index)
+                self.row_sources[row_index] = (source[0], list(source[1]))
+        self.dirty_rows.clear()
         
-        for row in self.screen:
-            line_parts = []
-            current_style = ""
-            
-            for cell in row:
-                cell_style = self.get_cell_style(cell)
-                
-                if cell_style != current_style:
-                    if current_style:
-                        line_parts.append('</span>')
-                    if cell_style:
-                        line_parts.append(f'<span style="{cell_style}">')
-                    current_style = cell_style
-                
-                # HTML escape the character
-                char = cell.char
-                if char == '<':
-                    char = '&lt;'
-                elif char == '>':
-                    char = '&gt;'
-                elif char == '&':
-                    char = '&amp;'
-                elif char == '"':
-                    char = '&quot;'
-                elif char == "'":
-                    char = '&#39;'
-                
-                line_parts.append(char)
-            
-            # Close any open span
-            if current_style:
-                line_parts.append('</span>')
-            
-            html_lines.append(''.join(line_parts))
+        html_lines = list(self.row_html)
         
         # Remove trailing empty lines
         while html_lines and not html_lines[-1].strip():
@@ -1,13 +1,18 @@
 """Linear ANSI to HTML converter with comprehensive color support."""
 
 import re
-from terminal_mcp_server.ansi_colors import parse_sgr_params, format_css_style
+from functools import lru_cache
+from typing import List, Tuple
+
+from terminal_mcp_server.ansi_colors import escape_html_text, parse_sgr_params, format_css_style
 
 class LinearAnsiToHtmlConverter:
     """Convert ANSI escape sequences to HTML with proper linear text flow."""
     
     def __init__(self):
         self.ansi_pattern = re.compile(r'\x1b\[([0-9;?]*)([a-zA-Z])')
+        # The start of a CSI sequence cut off at the end of the text
+        self.partial_pattern = re.compile(r'\x1b(?:\[[0-9;?]*)?\Z')
         self.current_state = {
             'fg_color': None,
             'bg_color': None,
@@ -20,6 +25,7 @@ class LinearAnsiToHtmlConverter:
             'strikethrough': False,
             'hidden': False
         }
+        self.reset_stream()
     
     def reset_state(self):
         """Reset formatting state."""
@@ -36,87 +42,149 @@ class LinearAnsiToHtmlConverter:
     
     def convert_to_html(self, text: str, title: str = "Terminal Output") -> str:
         """Convert ANSI text to HTML with linear processing."""
-        self.reset_state()
+        # The formatting state is shared with convert_appended
+        self.reset_stream()
+        
+        # Text without escape sequences only needs escaping
+        if '\x1b' not in text:
+            return self.wrap_html(escape_html_text(text).replace('\t', '    '), title)
         
         result = []
-        current_css = ""
-        i = 0
-        
-        while i < len(text):
-            # Look for ANSI escape sequences
-            match = self.ansi_pattern.match(text, i)
-            if match:
-                params_str, command = match.groups()
-                
-                # Handle SGR (color/formatting) sequences
-                if command == 'm':
-                    new_state = parse_sgr_params(params_str)
-                    self.update_state(new_state)
-                    
-                    # Check if CSS changed
-                    new_css = self.get_current_css()
-                    if new_css != current_css:
-                        # Close previous span
-                        if current_css:
-                            result.append('</span>')
-                        
-                        # Open new span
-                        if new_css:
-                            result.append(f'<span style="{new_css}">')
-                        
-                        current_css = new_css
-                
-                # Skip other escape sequences (cursor movement, etc.)
-                i = match.end()
-            else:
-                # Regular character
-                char = text[i]
-                
-                # HTML escape
-                if char == '<':
-                    result.append('&lt;')
-                elif char == '>':
-                    result.append('&gt;')
-                elif char == '&':
-                    result.append('&amp;')
-                elif char == '"':
-                    result.append('&quot;')
-                elif char == "'":
-                    result.append('&#39;')
-                elif char == '\t':
-                    result.append('    ')  # Convert tabs to 4 spaces
-                else:
-                    result.append(char)
-                
-                i += 1
+        _, current_css, _ = self.convert_text(text, 0, result, "", "", True)
         
         # Close final span
         if current_css:
             result.append('</span>')
         
         # Generate complete HTML
-        html_content = ''.join(result)
+        return self.wrap_html_parts(result, title)
+    
+    def convert_appended(self, text: str, title: str = "Terminal Output") -> str:
+        """Convert ANSI text that only grows between calls to HTML.
         
-        css = self.generate_css()
+        Session output is polled repeatedly while new output is appended to
+        it. When text extends the text from the previous call, only the new
+        part is parsed, continuing from the formatting state it left; any
+        other text is converted from scratch.
         
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-{css}
-    </style>
-</head>
-<body>
-    <div class="terminal">
-        <pre class="terminal-content">{html_content}</pre>
-    </div>
-</body>
-</html>"""
+        Args:
+            text: The ANSI text
+            title: Title of the HTML document
+            
+        Returns:
+            The same HTML as convert_to_html
+        """
+        if not text.startswith(self.stream_text):
+            self.reset_stream()
+        
+        parts = self.stream_parts
+        offset, self.stream_current_css, self.stream_pending_css = self.convert_text(
+            text, self.stream_offset, parts, self.stream_current_css, self.stream_pending_css, False
+        )
+        self.stream_text = text
+        self.stream_offset = offset
         
-        return html
+        # Collapse the converted HTML so later calls only join new parts
+        if len(parts) > 1:
+            parts[:] = [''.join(parts)]
+        
+        # Finish a trailing incomplete escape sequence as the complete text
+        # would be, without keeping the state it leaves
+        saved_state = dict(self.current_state)
+        tail = []
+        _, current_css, _ = self.convert_text(
+            text, offset, tail, self.stream_current_css, self.stream_pending_css, True
+        )
+        self.current_state = saved_state
+        if current_css:
+            tail.append('</span>')
+        
+        return self.wrap_html_parts(parts + tail, title)
+    
+    def reset_stream(self):
+        """Forget the text converted by convert_appended."""
+        self.reset_state()
+        self.stream_text = ""
+        self.stream_offset = 0
+        self.stream_parts = []
+        self.stream_current_css = ""
+        self.stream_pending_css = ""
+    
+    def convert_text(self, text: str, i: int, result: List[str], current_css: str,
+                     pending_css: str, final: bool) -> Tuple[int, str, str]:
+        """Convert ANSI text to HTML, updating the formatting state.
+        
+        Args:
+            text: The ANSI text
+            i: Offset in text to start converting from
+            result: List the HTML is appended to
+            current_css: CSS of the open span
+            pending_css: CSS for the next text written
+            final: Whether text is complete; otherwise conversion stops at a
+                trailing escape sequence that may be only partly received
+            
+        Returns:
+            Tuple of (offset conversion stopped at, current CSS, pending CSS)
+        """
+        while True:
+            # Copy the plain text up to the next escape sequence in one pass
+            esc = text.find('\x1b', i)
+            match = None
+            while esc >= 0:
+                match = self.ansi_pattern.match(text, esc)
+                if match or (not final and self.partial_pattern.match(text, esc)):
+                    break
+                # Not a CSI sequence: the ESC is kept as a regular character
+                esc = text.find('\x1b', esc + 1)
+            
+            end = esc if esc >= 0 else len(text)
+            if end > i:
+                # Change spans only when text is actually written, so
+                # consecutive SGR sequences produce a single span
+                if pending_css != current_css:
+                    # Close previous span
+                    if current_css:
+                        result.append('</span>')
+                    
+                    # Open new span
+                    if pending_css:
+                        result.append(f'<span style="{pending_css}">')
+                    
+                    current_css = pending_css
+                result.append(escape_html_text(text[i:end]).replace('\t', '    '))
+            if match is None:
+                return end, current_css, pending_css
+            
+            params_str, command = match.groups()
+            
+            # Handle SGR (color/formatting) sequences
+            if command == 'm':
+                new_state = parse_sgr_params(params_str)
+                self.update_state(new_state)
+                pending_css = self.get_current_css()
+            
+            # Skip other escape sequences (cursor movement, etc.)
+            i = match.end()
+    
+    def wrap_html(self, html_content: str, title: str) -> str:
+        """Wrap converted terminal content in a complete HTML document."""
+        return self.wrap_html_parts([html_content], title)
+    
+    def wrap_html_parts(self, parts: List[str], title: str) -> str:
+        """Wrap converted terminal content, given in parts, in a complete HTML document.
+        
+        The parts are joined straight into the document, so the content is
+        copied once rather than joined first and then formatted in.
+        
+        Args:
+            parts: The converted content, in order
+            title: Title of the HTML document
+            
+        Returns:
+            The HTML document
+        """
+        head, foot = html_envelope(title, self.generate_css())
+        return ''.join([head, *parts, foot])
     
     def generate_css(self) -> str:
         """Generate CSS for terminal styling."""
@@ -170,6 +238,39 @@ class LinearAnsiToHtmlConverter:
             background: #777;
         }"""
 
+@lru_cache(maxsize=64)
+def html_envelope(title: str, css: str) -> Tuple[str, str]:
+    """Build the HTML document that surrounds the terminal content.
+    
+    The document only depends on the title and CSS, so it is built once
+    for each of them.
+    
+    Args:
+        title: Title of the HTML document
+        css: CSS for the document
+        
+    Returns:
+        Tuple of (HTML before the content, HTML after the content)
+    """
+    head = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+{css}
+    </style>
+</head>
+<body>
+    <div class="terminal">
+        <pre class="terminal-content">"""
+    foot = """</pre>
+    </div>
+</body>
+</html>"""
+    return head, foot
+
 def convert_ansi_to_html_linear(text: str, title: str = "Terminal Output") -> str:
     """Convert ANSI text to HTML with linear processing."""
     converter = LinearAnsiToHtmlConverter()
@@ -1,33 +1,80 @@
 """ANSI escape sequence to plain text converter with proper 2D terminal screen handling."""
 
 import re
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+from terminal_mcp_server.ansi_colors import parse_csi_params
+
+# CSI sequences as removed by the linear converter (parameters not captured)
+LINEAR_CSI_PATTERN = re.compile(r'\x1b\[[0-9;?]*[a-zA-Z]')
+
+# Printable runs, written to the screen a row segment at a time, and single
+# control characters
+PLAIN_TEXT_PATTERN = re.compile(r'([^\x00-\x1f]+)|[\x00-\x1f]')
+
+# CSI parameter and intermediate bytes, which a CSI sequence cut off at the
+# end of the text consists of
+CSI_BODY_PATTERN = re.compile(r'[0-?]*[ -/]*')
 
 
 class Terminal2DTextRenderer:
-    """Renders ANSI escape sequences to plain text with proper 2D terminal layout."""
+    """Renders ANSI escape sequences to plain text with proper 2D terminal layout.
+    
+    The screen attribute holds one string of exactly width characters per
+    row. Characters are read with screen[row][col]; changing one means
+    replacing the whole row string.
+    """
     
     # ANSI escape sequence patterns
     CSI_PATTERN = re.compile(r'\x1b\[([0-9;?]*)([a-zA-Z])')
     OSC_PATTERN = re.compile(r'\x1b\]([^\x07\x1b]*)\x07')
     SIMPLE_ESCAPE_PATTERN = re.compile(r'\x1b[^[]')
     
+    # Every escape sequence, so that none reaches process_plain_text: handled
+    # CSI (captured), other CSI, OSC, charset designation, then any other escape
+    ESCAPE_SEQUENCE_PATTERN = re.compile('|'.join([
+        CSI_PATTERN.pattern,
+        r'\x1b\[[0-?]*[ -/]*[@-~]',
+        r'\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)',
+        r'\x1b[()#%*+].',
+        r'\x1b[\s\S]?',
+    ]))
+    
     def __init__(self, width: int = 120, height: int = 40):
         """Initialize the terminal renderer."""
         self.width = width
         self.height = height
+        self.blank_row = ' ' * width
+        
+        # CSI handlers keyed by final byte (SGR is not needed for plain text)
+        self.csi_handlers = {
+            'H': self.handle_cursor_position,
+            'f': self.handle_cursor_position,
+            'A': self.handle_cursor_up,
+            'B': self.handle_cursor_down,
+            'C': self.handle_cursor_forward,
+            'D': self.handle_cursor_back,
+        }
+        
         self.reset_terminal()
     
     def reset_terminal(self):
         """Reset the terminal state."""
-        # Create 2D grid of characters (no color info needed)
-        self.screen = [[' ' for _ in range(self.width)] for _ in range(self.height)]
+        # Screen rows as strings of exactly width characters (no color info
+        # needed); writes replace a row rather than mutating it. This is a
+        # list of row strings, not a List[List[str]] grid, so screen[r][c]
+        # can be read but not assigned
+        self.screen: List[str] = [self.blank_row] * self.height
         
         # Current cursor position
         self.cursor_row = 0
         self.cursor_col = 0
+        
+        # Text given to render_appended, and the offset it was processed up to
+        self.appended_text = ""
+        self.appended_offset = 0
     
-    def handle_cursor_position(self, params: List[int]):
+    def handle_cursor_position(self, params: Sequence[int]):
         """Handle cursor positioning (CUP) sequences."""
         if not params:
             row, col = 1, 1
@@ -42,77 +89,171 @@ class Terminal2DTextRenderer:
     
     def put_char(self, char: str):
         """Put a character at the current cursor position."""
-        if 0 <= self.cursor_row < self.height and 0 <= self.cursor_col < self.width:
-            self.screen[self.cursor_row][self.cursor_col] = char
+        self.put_text(char)
+    
+    def put_text(self, text: str):
+        """Put printable text at the cursor, wrapping at the right margin.
+        
+        Each row segment is written with one string splice. Text past the
+        bottom row is dropped.
+        """
+        pos = 0
+        length = len(text)
+        while pos < length and 0 <= self.cursor_row < self.height:
+            col = self.cursor_col
+            count = min(length - pos, self.width - col)
+            line = self.screen[self.cursor_row]
+            self.screen[self.cursor_row] = line[:col] + text[pos:pos + count] + line[col + count:]
+            pos += count
             
             # Advance cursor
-            self.cursor_col += 1
+            self.cursor_col = col + count
             if self.cursor_col >= self.width:
                 self.cursor_col = 0
                 self.cursor_row += 1
     
-    def process_text(self, text: str):
-        """Process ANSI text and populate the terminal screen (text only)."""
-        i = 0
-        while i < len(text):
-            # Look for ANSI escape sequences
-            csi_match = self.CSI_PATTERN.match(text, i)
-            if csi_match:
-                # Process CSI sequence
-                params_str, command = csi_match.groups()
-                
-                # Parse parameters
-                params = []
-                if params_str:
-                    try:
-                        # Handle parameters with ? prefix
-                        clean_params = params_str.lstrip('?')
-                        if clean_params:
-                            params = [int(p) if p else 0 for p in clean_params.split(';')]
-                    except ValueError:
-                        params = []
-                
-                # Handle cursor movement commands (ignore color commands)
-                if command in ['H', 'f']:
-                    # CUP - Cursor Position
-                    self.handle_cursor_position(params)
-                elif command == 'A':
-                    # CUU - Cursor Up
-                    count = params[0] if params else 1
-                    self.cursor_row = max(0, self.cursor_row - count)
-                elif command == 'B':
-                    # CUD - Cursor Down
-                    count = params[0] if params else 1
-                    self.cursor_row = min(self.height - 1, self.cursor_row + count)
-                elif command == 'C':
-                    # CUF - Cursor Forward
-                    count = params[0] if params else 1
-                    self.cursor_col = min(self.width - 1, self.cursor_col + count)
-                elif command == 'D':
-                    # CUB - Cursor Back
-                    count = params[0] if params else 1
-                    self.cursor_col = max(0, self.cursor_col - count)
-                # Ignore SGR (color) and other sequences
-                
-                i = csi_match.end()
-                continue
+    def process_text(self, text: str, start: int = 0, final: bool = True) -> int:
+        """Process ANSI text and populate the terminal screen (text only).
+        
+        Args:
+            text: The ANSI text
+            start: Offset in text to start processing from
+            final: Whether text is complete; otherwise processing stops before
+                a trailing escape sequence that may be only partly received
+            
+        Returns:
+            Offset processing stopped at
+        """
+        matches = self.ESCAPE_SEQUENCE_PATTERN.finditer(text, start)
+        end = len(text)
+        if not final:
+            matches = list(matches)
+            end = self.find_incomplete_escape(text, matches)
+        
+        pos = start
+        for match in matches:
+            if match.start() >= end:
+                break
+            if match.start() > pos:
+                self.process_plain_text(text[pos:match.start()])
             
-            # Look for OSC sequences (title setting, etc.)
-            osc_match = self.OSC_PATTERN.match(text, i)
-            if osc_match:
-                # Skip OSC sequences
-                i = osc_match.end()
+            params_str, command = match.group(1, 2)
+            if command:
+                self.handle_csi(params_str, command)
+            # OSC (title setting, etc.) and simple escape sequences are skipped
+            
+            pos = match.end()
+        
+        if pos < end:
+            self.process_plain_text(text[pos:end])
+        return end
+    
+    def find_incomplete_escape(self, text: str, matches: List[re.Match]) -> int:
+        """Find an escape sequence that more text could make parse differently.
+        
+        Only the last sequence can be affected, or the one before it when the
+        text ends in an ESC that may start the ST terminating an OSC sequence.
+        
+        Args:
+            text: The ANSI text
+            matches: ESCAPE_SEQUENCE_PATTERN matches in text, in order
+            
+        Returns:
+            Offset of the sequence, or len(text) if there is none
+        """
+        end = len(text)
+        candidates = matches[-1:]
+        if candidates and candidates[0].start() == end - 1:
+            candidates = matches[-2:]
+        
+        for match in candidates:
+            start, stop = match.span()
+            if stop - start > 2:
+                # A CSI, OSC or charset sequence that was matched whole
                 continue
             
-            # Look for simple escape sequences
-            simple_match = self.SIMPLE_ESCAPE_PATTERN.match(text, i)
-            if simple_match:
-                # Skip simple escape sequences
-                i = simple_match.end()
+            kind = text[start + 1:stop]
+            if not kind:
+                incomplete = True
+            elif kind == '[':
+                incomplete = CSI_BODY_PATTERN.match(text, stop).end() == end
+            elif kind == ']':
+                incomplete = text.find('\x07', stop) < 0 and text.find('\x1b', stop, end - 1) < 0
+            else:
+                incomplete = kind in '()#%*+' and stop == end
+            if incomplete:
+                return start
+        return end
+    
+    def render_appended(self, text: str) -> str:
+        """Render ANSI text that only grows between calls to plain text.
+        
+        Session output is rendered repeatedly while new output is appended to
+        it. When text extends the text from the previous call, only the new
+        part is processed, continuing from the screen it left; any other text
+        is processed from scratch.
+        
+        Args:
+            text: The ANSI text
+            
+        Returns:
+            The same text as render_to_text after processing the whole text
+        """
+        if not text.startswith(self.appended_text):
+            self.reset_terminal()
+        
+        offset = self.process_text(text, self.appended_offset, final=False)
+        self.appended_text = text
+        self.appended_offset = offset
+        if offset == len(text):
+            return self.render_to_text()
+        
+        # Finish a trailing incomplete escape sequence as the complete text
+        # would be, without keeping the screen it leaves
+        saved = (list(self.screen), self.cursor_row, self.cursor_col)
+        self.process_text(text, offset)
+        rendered = self.render_to_text()
+        self.screen, self.cursor_row, self.cursor_col = saved
+        return rendered
+    
+    def handle_csi(self, params_str: str, command: str):
+        """Handle a CSI sequence, ignoring everything but cursor movement."""
+        params = parse_csi_params(params_str, strip_private=True)
+        
+        # Dispatch on the final byte; unknown commands are ignored
+        handler = self.csi_handlers.get(command)
+        if handler:
+            handler(params)
+    
+    def handle_cursor_up(self, params: Sequence[int]):
+        """Handle cursor up (CUU) sequences."""
+        count = params[0] if params else 1
+        self.cursor_row = max(0, self.cursor_row - count)
+    
+    def handle_cursor_down(self, params: Sequence[int]):
+        """Handle cursor down (CUD) sequences."""
+        count = params[0] if params else 1
+        self.cursor_row = min(self.height - 1, self.cursor_row + count)
+    
+    def handle_cursor_forward(self, params: Sequence[int]):
+        """Handle cursor forward (CUF) sequences."""
+        count = params[0] if params else 1
+        self.cursor_col = min(self.width - 1, self.cursor_col + count)
+    
+    def handle_cursor_back(self, params: Sequence[int]):
+        """Handle cursor back (CUB) sequences."""
+        count = params[0] if params else 1
+        self.cursor_col = max(0, self.cursor_col - count)
+    
+    def process_plain_text(self, text: str):
+        """Process text that contains no escape sequences."""
+        for match in PLAIN_TEXT_PATTERN.finditer(text):
+            run = match.group(1)
+            if run:
+                self.put_text(run)
                 continue
             
-            # Regular character
-            char = text[i]
+            char = match.group()
             if char == '\r':
                 # Carriage return - move to beginning of line
                 self.cursor_col = 0
@@ -125,19 +266,11 @@ class Terminal2DTextRenderer:
                 # Tab - advance to next tab stop (every 8 columns)
                 next_tab = ((self.cursor_col // 8) + 1) * 8
                 self.cursor_col = min(self.width - 1, next_tab)
-            elif ord(char) >= 32:  # Printable character
-                self.put_char(char)
-            
-            i += 1
     
     def render_to_text(self) -> str:
         """Render the terminal screen to plain text."""
-        lines = []
-        
-        for row in self.screen:
-            # Convert row to string and strip trailing spaces
-            line = ''.join(row).rstrip()
-            lines.append(line)
+        # Strip trailing spaces from each row
+        lines = [row.rstrip() for row in self.screen]
         
         # Remove trailing empty lines
         while lines and not lines[-1].strip():
@@ -155,15 +288,16 @@ def convert_ansi_to_text_2d(text: str, width: int = 120, height: int = 40) -> st
 
 def convert_ansi_to_text_linear(text: str) -> str:
     """Convert ANSI text to plain text with linear processing (for simple commands)."""
+    # Output of simple commands often has no escapes at all; the substring
+    # test is a single C-level scan instead of three regex passes
+    if '\x1b' not in text:
+        return text
+    
     # Remove all ANSI escape sequences
-    ansi_pattern = re.compile(r'\x1b\[[0-9;?]*[a-zA-Z]')
-    clean_text = ansi_pattern.sub('', text)
+    clean_text = LINEAR_CSI_PATTERN.sub('', text)
     
     # Clean up other escape sequences
-    osc_pattern = re.compile(r'\x1b\]([^\x07\x1b]*)\x07')
-    clean_text = osc_pattern.sub('', clean_text)
-    
-    simple_escape_pattern = re.compile(r'\x1b[^[]')
-    clean_text = simple_escape_pattern.sub('', clean_text)
+    clean_text = Terminal2DTextRenderer.OSC_PATTERN.sub('', clean_text)
+    clean_text = Terminal2DTextRenderer.SIMPLE_ESCAPE_PATTERN.sub('', clean_text)
     
     return clean_text
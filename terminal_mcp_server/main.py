@@ -10,11 +10,11 @@ import uuid
 import signal
 import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 
 from terminal_mcp_server.terminal_manager import TerminalManager
-from terminal_mcp_server.ansi_to_html_linear import convert_ansi_to_html_linear
-from terminal_mcp_server.ansi_to_text_2d import convert_ansi_to_text_2d, convert_ansi_to_text_linear
+from terminal_mcp_server.ansi_to_html_linear import LinearAnsiToHtmlConverter
+from terminal_mcp_server.ansi_to_text_2d import Terminal2DTextRenderer, convert_ansi_to_text_linear
 
 # Configure logging to stderr to avoid interfering with stdio communication
 logging.basicConfig(
@@ -57,6 +57,11 @@ def get_tools_definition():
                         "description": "Terminal emulator to use (xterm, gnome-terminal, konsole, tmux)",
                         "enum": ["xterm", "gnome-terminal", "konsole", "tmux"],
                         "default": None
+                    },
+                    "interactive": {
+                        "type": "boolean",
+                        "description": "Whether input will be sent to the session; set to false for one-shot commands to run them to completion without a PTY. Only applies when use_terminal_emulator is false. The call then blocks until the command finishes, and timeout becomes a hard limit: a command still running is killed and reports exit code -1. Without a PTY the output is not a terminal, so programs such as ls print without color and one entry per line",
+                        "default": True
                     }
                 },
                 "required": ["command"]
@@ -167,6 +172,16 @@ class MCPServer:
         self.running = True
         self.initialized = False
         
+        # Last rendering of each session's output per variant, as (raw output, content)
+        self._render_cache: Dict[str, Dict[tuple, Tuple[str, str]]] = {}
+        
+        # HTML converter per session, which resumes where it left off while
+        # the session's output only grows
+        self._html_converters: Dict[str, LinearAnsiToHtmlConverter] = {}
+        
+        # 2D text renderer per session, likewise fed only new output
+        self._text_renderers: Dict[str, Terminal2DTextRenderer] = {}
+        
         # Set up signal handlers
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -175,6 +190,59 @@ class MCPServer:
         """Handle shutdown signals."""
         logger.error(f"Received signal {signum}, shutting down gracefully")
         self.running = False
+    
+    def _forget_session(self, session_id: str) -> None:
+        """Drop the cached renderings and renderers kept for a session.
+        
+        Called whenever a session id is removed or reused for a new session,
+        so the old session's output isn't kept alive or served again.
+        
+        Args:
+            session_id: The session to forget
+        """
+        self._render_cache.pop(session_id, None)
+        self._html_converters.pop(session_id, None)
+        self._text_renderers.pop(session_id, None)
+    
+    def cleanup(self) -> None:
+        """Terminate every session and drop everything cached for them."""
+        self.terminal_manager.cleanup()
+        self._render_cache.clear()
+        self._html_converters.clear()
+        self._text_renderers.clear()
+    
+    def _render_output(self, session_id: str, variant: tuple, raw_output: str,
+                       render: Callable[[str], str]) -> str:
+        """Render session output, reusing the previous result while the output is unchanged.
+        
+        Clients poll the HTML and text views repeatedly; when no new output has
+        arrived since the last call, the buffer is not parsed again.
+        
+        Args:
+            session_id: The session the output belongs to
+            variant: Key for the kind of rendering and its options
+            raw_output: The session's raw output
+            render: Converts raw output to the rendered content
+            
+        Returns:
+            The rendered content
+        """
+        cache = self._render_cache.setdefault(session_id, {})
+        cached = cache.get(variant)
+        # Sessions hand back the same string object until new output arrives,
+        # so this is usually an identity check
+        if cached is not None and cached[0] == raw_output:
+            return cached[1]
+        
+        try:
+            content = render(raw_output)
+        except Exception:
+            # A converter that failed partway has advanced past output the
+            # cache doesn't cover; start the session's renderings afresh
+            self._forget_session(session_id)
+            raise
+        cache[variant] = (raw_output, content)
+        return content
         
     async def handle_request(self, request: dict) -> dict:
         """Handle a JSON-RPC request."""
@@ -219,12 +287,15 @@ class MCPServer:
                 
                 if tool_name == "run_command":
                     session_id = tool_args.get("session_id") or self.terminal_manager.generate_session_id()
+                    # A reused id replaces its session, so nothing cached for it still applies
+                    self._forget_session(session_id)
                     output, exit_code, running = self.terminal_manager.run_command(
                         tool_args["command"], 
                         session_id, 
                         tool_args.get("timeout", 30),
                         tool_args.get("use_terminal_emulator", False),
-                        tool_args.get("terminal_emulator")
+                        tool_args.get("terminal_emulator"),
+                        tool_args.get("interactive", True)
                     )
                     return {
                         "jsonrpc": "2.0",
@@ -348,6 +419,7 @@ class MCPServer:
                 
                 elif tool_name == "terminate_session":
                     self.terminal_manager.terminate_session(tool_args["session_id"])
+                    self._forget_session(tool_args["session_id"])
                     return {
                         "jsonrpc": "2.0",
                         "id": req_id,
@@ -413,7 +485,14 @@ class MCPServer:
                         # Convert to HTML with comprehensive ANSI support
                         title = tool_args.get("title", "Terminal Output")
                         try:
-                            html_content = convert_ansi_to_html_linear(raw_output, title)
+                            converter = self._html_converters.get(tool_args["session_id"])
+                            if converter is None:
+                                converter = LinearAnsiToHtmlConverter()
+                                self._html_converters[tool_args["session_id"]] = converter
+                            html_content = self._render_output(
+                                tool_args["session_id"], ("html", title), raw_output,
+                                lambda output: converter.convert_appended(output, title)
+                            )
                             logger.debug(f"Generated HTML content - length: {len(html_content)}")
                             
                         except Exception as e:
@@ -508,10 +587,17 @@ Raw output:
                         try:
                             if use_2d_layout:
                                 # Use 2D layout for TUI applications
-                                text_content = convert_ansi_to_text_2d(raw_output, width=120, height=40)
+                                renderer = self._text_renderers.get(tool_args["session_id"])
+                                if renderer is None:
+                                    renderer = Terminal2DTextRenderer(width=120, height=40)
+                                    self._text_renderers[tool_args["session_id"]] = renderer
+                                render = renderer.render_appended
                             else:
                                 # Use linear processing for simple commands
-                                text_content = convert_ansi_to_text_linear(raw_output)
+                                render = convert_ansi_to_text_linear
+                            text_content = self._render_output(
+                                tool_args["session_id"], ("text", use_2d_layout), raw_output, render
+                            )
                             
                             logger.debug(f"Generated text content - length: {len(text_content)}")
                             
@@ -616,6 +702,19 @@ Raw output:
         finally:
             logger.info("MCP server shutting down")
             self.running = False
+            self.cleanup()
+    
+    def _write_message(self, message: dict) -> None:
+        """Serialize a JSON-RPC message once and write it to stdout in a single write.
+        
+        Args:
+            message: The message to send
+        """
+        line = json.dumps(message) + "\n"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sending response: {line.rstrip()}")
+        sys.stdout.write(line)
+        sys.stdout.flush()
     
     def _read_input(self):
         """Read input from stdin in a separate thread."""
@@ -653,7 +752,7 @@ Raw output:
                                 "message": f"Parse error: {str(e)}"
                             }
                         }
-                        print(json.dumps(error_response), flush=True)
+                        self._write_message(error_response)
                         continue
                     
                     # Mark as initialized if this is an initialize request
@@ -665,8 +764,7 @@ Raw output:
                     
                     # Send response to stdout (only if there is a response)
                     if response is not None:
-                        logger.debug(f"Sending response: {json.dumps(response)}")
-                        print(json.dumps(response), flush=True)
+                        self._write_message(response)
                     else:
                         logger.debug("No response needed (notification)")
                     
@@ -4,10 +4,22 @@ Terminal screen buffer for capturing and interpreting terminal output.
 
 import re
 import logging
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Sequence
+
+from .ansi_colors import parse_csi_params
 
 logger = logging.getLogger(__name__)
 
+# A run of characters that can be written without control handling
+PRINTABLE_RUN_PATTERN = re.compile(r'[^\x00-\x1f]+')
+
+# A whole CSI sequence: its parameters and final byte, which is missing
+# when the data ends first
+CSI_PATTERN = re.compile(r'\x1b\[([0-9;?]*)(.)?', re.DOTALL)
+
+# The BEL or ST that terminates an OSC sequence
+OSC_END_PATTERN = re.compile(r'\x07|\x1b\\')
+
 
 class TerminalScreenBuffer:
     """A buffer that maintains the current state of a terminal screen."""
@@ -24,12 +36,25 @@ class TerminalScreenBuffer:
         self.cursor_row = 0
         self.cursor_col = 0
         
-        # Initialize screen with empty spaces
-        self.screen = [[' ' for _ in range(cols)] for _ in range(rows)]
+        # Each row is one string of exactly cols characters; rows are
+        # immutable and compact, and writes splice a new row into place
+        self._blank_row = ' ' * cols
+        self.screen = [self._blank_row] * rows
         
         # Raw output buffer for debugging
         self.raw_buffer = ""
         
+        # CSI handlers keyed by final byte; SGR ('m') and anything else is ignored
+        self._csi_handlers = {
+            'H': self._cursor_position,
+            'A': self._cursor_up,
+            'B': self._cursor_down,
+            'C': self._cursor_right,
+            'D': self._cursor_left,
+            'J': self._erase_display,
+            'K': self._erase_line,
+        }
+        
     def process_data(self, data: str) -> None:
         """Process incoming terminal data and update screen buffer.
         
@@ -42,12 +67,32 @@ class TerminalScreenBuffer:
         if len(self.raw_buffer) > 10000:
             self.raw_buffer = self.raw_buffer[-8000:]
         
+        # Hot loop: bind lookups to locals and test for printable text first
+        match_run = PRINTABLE_RUN_PATTERN.match
+        match_csi = CSI_PATTERN.match
+        put_text = self._put_text
+        csi_handlers = self._csi_handlers
+        length = len(data)
+        
         i = 0
-        while i < len(data):
+        while i < length:
             char = data[i]
             
-            if char == '\x1b':  # ESC - start of escape sequence
-                i = self._process_escape_sequence(data, i)
+            if char >= ' ':  # Printable characters
+                run = match_run(data, i)
+                put_text(run.group())
+                i = run.end()
+            elif char == '\x1b':  # ESC - start of escape sequence
+                csi = match_csi(data, i)
+                if csi is None:
+                    i = self._process_escape_sequence(data, i)
+                else:
+                    # CSI sequences are matched whole and dispatched here
+                    # on their final byte
+                    handler = csi_handlers.get(csi.group(2))
+                    if handler:
+                        handler(parse_csi_params(csi.group(1)))
+                    i = csi.end()
             elif char == '\r':  # Carriage return
                 self.cursor_col = 0
                 i += 1
@@ -67,15 +112,14 @@ class TerminalScreenBuffer:
                 if self.cursor_col > 0:
                     self.cursor_col -= 1
                 i += 1
-            elif ord(char) >= 32:  # Printable character
-                self._put_char(char)
-                i += 1
             else:
                 # Skip other control characters
                 i += 1
     
     def _process_escape_sequence(self, data: str, start: int) -> int:
-        """Process an ANSI escape sequence.
+        """Process an ANSI escape sequence other than CSI.
+        
+        CSI sequences are matched and dispatched by process_data itself.
         
         Args:
             data: The data string
@@ -87,80 +131,58 @@ class TerminalScreenBuffer:
         if start + 1 >= len(data):
             return start + 1
         
-        if data[start + 1] == '[':  # CSI sequence
-            return self._process_csi_sequence(data, start)
-        elif data[start + 1] == ']':  # OSC sequence
+        if data[start + 1] == ']':  # OSC sequence
             return self._process_osc_sequence(data, start)
+        elif data[start + 1] in '()#%*+':  # Charset designation takes one more byte
+            return min(start + 3, len(data))
         else:
             # Other escape sequences - skip for now
             return start + 2
     
-    def _process_csi_sequence(self, data: str, start: int) -> int:
-        """Process a CSI (Control Sequence Introducer) sequence.
-        
-        Args:
-            data: The data string
-            start: Starting position of the CSI sequence
-            
-        Returns:
-            New position after processing the sequence
-        """
-        # Find the end of the CSI sequence
-        i = start + 2  # Skip ESC[
-        while i < len(data) and data[i] in '0123456789;?':
-            i += 1
-        
-        if i >= len(data):
-            return len(data)
-        
-        command = data[i]
-        params_str = data[start + 2:i]
-        
-        # Parse parameters
-        if params_str:
-            try:
-                params = [int(p) if p else 0 for p in params_str.split(';')]
-            except ValueError:
-                params = []
-        else:
-            params = []
-        
-        # Process common CSI commands
-        if command == 'H':  # Cursor position
-            row = (params[0] - 1) if params else 0
-            col = (params[1] - 1) if len(params) > 1 else 0
-            self.cursor_row = max(0, min(row, self.rows - 1))
-            self.cursor_col = max(0, min(col, self.cols - 1))
-        elif command == 'A':  # Cursor up
-            n = params[0] if params else 1
-            self.cursor_row = max(0, self.cursor_row - n)
-        elif command == 'B':  # Cursor down
-            n = params[0] if params else 1
-            self.cursor_row = min(self.rows - 1, self.cursor_row + n)
-        elif command == 'C':  # Cursor right
-            n = params[0] if params else 1
-            self.cursor_col = min(self.cols - 1, self.cursor_col + n)
-        elif command == 'D':  # Cursor left
-            n = params[0] if params else 1
-            self.cursor_col = max(0, self.cursor_col - n)
-        elif command == 'J':  # Erase display
-            if not params or params[0] == 0:  # Clear from cursor to end
-                self._clear_from_cursor_to_end()
-            elif params[0] == 1:  # Clear from start to cursor
-                self._clear_from_start_to_cursor()
-            elif params[0] == 2:  # Clear entire screen
-                self._clear_screen()
-        elif command == 'K':  # Erase line
-            if not params or params[0] == 0:  # Clear from cursor to end of line
-                self._clear_line_from_cursor()
-            elif params[0] == 1:  # Clear from start of line to cursor
-                self._clear_line_to_cursor()
-            elif params[0] == 2:  # Clear entire line
-                self._clear_entire_line()
-        elif command == 'm':  # SGR (colors, etc.) - ignore for now
-            pass
-        
-        return i + 1
+    def _cursor_position(self, params: Sequence[int]) -> None:
+        """Move the cursor to an absolute position (CUP)."""
+        row = (params[0] - 1) if params else 0
+        col = (params[1] - 1) if len(params) > 1 else 0
+        self.cursor_row = max(0, min(row, self.rows - 1))
+        self.cursor_col = max(0, min(col, self.cols - 1))
+    
+    def _cursor_up(self, params: Sequence[int]) -> None:
+        """Move the cursor up (CUU)."""
+        n = params[0] if params else 1
+        self.cursor_row = max(0, self.cursor_row - n)
+    
+    def _cursor_down(self, params: Sequence[int]) -> None:
+        """Move the cursor down (CUD)."""
+        n = params[0] if params else 1
+        self.cursor_row = min(self.rows - 1, self.cursor_row + n)
+    
+    def _cursor_right(self, params: Sequence[int]) -> None:
+        """Move the cursor right (CUF)."""
+        n = params[0] if params else 1
+        self.cursor_col = min(self.cols - 1, self.cursor_col + n)
+    
+    def _cursor_left(self, params: Sequence[int]) -> None:
+        """Move the cursor left (CUB)."""
+        n = params[0] if params else 1
+        self.cursor_col = max(0, self.cursor_col - n)
+    
+    def _erase_display(self, params: Sequence[int]) -> None:
+        """Erase part of the display (ED)."""
+        if not params or params[0] == 0:  # Clear from cursor to end
+            self._clear_from_cursor_to_end()
+        elif params[0] == 1:  # Clear from start to cursor
+            self._clear_from_start_to_cursor()
+        elif params[0] == 2:  # Clear entire screen
+            self._clear_screen()
+    
+    def _erase_line(self, params: Sequence[int]) -> None:
+        """Erase part of the current line (EL)."""
+        if not params or params[0] == 0:  # Clear from cursor to end of line
+            self._clear_line_from_cursor()
+        elif params[0] == 1:  # Clear from start of line to cursor
+            self._clear_line_to_cursor()
+        elif params[0] == 2:  # Clear entire line
+            self._clear_entire_line()
     
     def _process_osc_sequence(self, data: str, start: int) -> int:
         """Process an OSC (Operating System Command) sequence.
@@ -172,16 +194,10 @@ class TerminalScreenBuffer:
         Returns:
             New position after processing the sequence
         """
-        # Find the end of the OSC sequence (terminated by BEL or ST)
-        i = start + 2  # Skip ESC]
-        while i < len(data):
-            if data[i] == '\x07':  # BEL
-                return i + 1
-            elif i + 1 < len(data) and data[i:i+2] == '\x1b\\':  # ST
-                return i + 2
-            i += 1
-        
-        return len(data)
+        # Find the end of the OSC sequence (terminated by BEL or ST) with a
+        # single scan in C; titles and hyperlinks can be long
+        end = OSC_END_PATTERN.search(data, start + 2)
+        return end.end() if end else len(data)
     
     def _put_char(self, char: str) -> None:
         """Put a character at the current cursor position.
@@ -189,9 +205,35 @@ class TerminalScreenBuffer:
         Args:
             char: Character to put
         """
-        if self.cursor_row < self.rows and self.cursor_col < self.cols:
-            self.screen[self.cursor_row][self.cursor_col] = char
-            self.cursor_col += 1
+        self._put_text(char)
+    
+    def _put_text(self, text: str) -> None:
+        """Put a run of printable characters starting at the cursor position.
+        
+        Each row segment is spliced into its row in one step, wrapping to
+        the next line when the right margin is reached.
+        
+        Args:
+            text: Printable characters to put
+        """
+        # Fast path: the run fits on the current row without wrapping
+        col = self.cursor_col
+        end = col + len(text)
+        if end < self.cols:
+            row = self.screen[self.cursor_row]
+            self.screen[self.cursor_row] = row[:col] + text + row[end:]
+            self.cursor_col = end
+            return
+        
+        pos = 0
+        while pos < len(text):
+            n = min(len(text) - pos, self.cols - self.cursor_col)
+            row = self.screen[self.cursor_row]
+            self.screen[self.cursor_row] = (
+                row[:self.cursor_col] + text[pos:pos + n] + row[self.cursor_col + n:]
+            )
+            self.cursor_col += n
+            pos += n
             
             if self.cursor_col >= self.cols:
                 self.cursor_col = 0
@@ -202,52 +244,45 @@ class TerminalScreenBuffer:
     
     def _scroll_up(self) -> None:
         """Scroll the screen up by one line."""
-        for i in range(self.rows - 1):
-            self.screen[i] = self.screen[i + 1][:]
-        self.screen[self.rows - 1] = [' ' for _ in range(self.cols)]
+        # Rows move by reference; the new bottom row is the shared blank row
+        del self.screen[0]
+        self.screen.append(self._blank_row)
     
     def _clear_screen(self) -> None:
         """Clear the entire screen."""
-        self.screen = [[' ' for _ in range(self.cols)] for _ in range(self.rows)]
+        self.screen = [self._blank_row] * self.rows
         self.cursor_row = 0
         self.cursor_col = 0
     
     def _clear_from_cursor_to_end(self) -> None:
         """Clear from cursor to end of screen."""
         # Clear rest of current line
-        for col in range(self.cursor_col, self.cols):
-            self.screen[self.cursor_row][col] = ' '
+        self._clear_line_from_cursor()
         
         # Clear remaining lines
-        for row in range(self.cursor_row + 1, self.rows):
-            for col in range(self.cols):
-                self.screen[row][col] = ' '
+        self.screen[self.cursor_row + 1:] = [self._blank_row] * (self.rows - self.cursor_row - 1)
     
     def _clear_from_start_to_cursor(self) -> None:
         """Clear from start of screen to cursor."""
         # Clear previous lines
-        for row in range(self.cursor_row):
-            for col in range(self.cols):
-                self.screen[row][col] = ' '
+        self.screen[:self.cursor_row] = [self._blank_row] * self.cursor_row
         
         # Clear current line up to cursor
-        for col in range(self.cursor_col + 1):
-            self.screen[self.cursor_row][col] = ' '
+        self._clear_line_to_cursor()
     
     def _clear_line_from_cursor(self) -> None:
         """Clear from cursor to end of current line."""
-        for col in range(self.cursor_col, self.cols):
-            self.screen[self.cursor_row][col] = ' '
+        row = self.screen[self.cursor_row]
+        self.screen[self.cursor_row] = row[:self.cursor_col] + ' ' * (self.cols - self.cursor_col)
     
     def _clear_line_to_cursor(self) -> None:
         """Clear from start of line to cursor."""
-        for col in range(self.cursor_col + 1):
-            self.screen[self.cursor_row][col] = ' '
+        end = min(self.cursor_col + 1, self.cols)
+        self.screen[self.cursor_row] = ' ' * end + self.screen[self.cursor_row][end:]
     
     def _clear_entire_line(self) -> None:
         """Clear the entire current line."""
-        for col in range(self.cols):
-            self.screen[self.cursor_row][col] = ' '
+        self.screen[self.cursor_row] = self._blank_row
     
     def get_screen_content(self) -> str:
         """Get the current screen content as a string.
@@ -255,10 +290,7 @@ class TerminalScreenBuffer:
         Returns:
             String representation of the screen
         """
-        lines = []
-        for row in self.screen:
-            line = ''.join(row).rstrip()
-            lines.append(line)
+        lines = [row.rstrip() for row in self.screen]
         
         # Remove trailing empty lines
         while lines and not lines[-1]:
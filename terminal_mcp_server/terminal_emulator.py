@@ -1,5 +1,6 @@
 """Terminal emulator manager for running TUI applications."""
 
+import codecs
 import logging
 import os
 import pty
@@ -16,16 +17,23 @@ from .screen_buffer import TerminalScreenBuffer
 
 logger = logging.getLogger(__name__)
 
-# Regular expression to match ANSI escape sequences
-ANSI_ESCAPE_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+# Regular expression to match ANSI escape sequences, with CSI sequences
+# (by far the most common) tried first
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1B(?:\[[0-?]*[ -/]*[@-~]|[@-Z\\-_])')
 
 def strip_ansi_escape_sequences(text: str) -> str:
     """Strip ANSI escape sequences from text."""
+    # Most output has no escapes at all; the substring test is a C-level scan
+    if '\x1b' not in text:
+        return text
     return ANSI_ESCAPE_PATTERN.sub('', text)
 
 
 class TerminalEmulatorSession:
     """Class representing a terminal emulator session."""
+    
+    # get_output accepts a raw override
+    _supports_raw_kwarg = True
 
     def __init__(
         self, 
@@ -43,7 +51,6 @@ class TerminalEmulatorSession:
         self.emulator = emulator
         
         self.process = None
-        self.output_buffer = ""
         self.exit_code = None
         self.start_time = time.time()
         
@@ -58,6 +65,20 @@ class TerminalEmulatorSession:
         self.slave_fd = None
         self.running = True
         
+        # Signalled by the reader thread whenever output has been processed
+        # and when it stops; also guards the raw output chunks
+        self._output_ready = threading.Condition()
+        self._output_seq = 0
+        self._reader_alive = True
+        
+        # Raw output as a list of chunks, joined only when read
+        self._output_chunks: List[str] = []
+        self._output_size = 0
+        
+        # Decodes each read in one pass, holding back a multi-byte character
+        # split across reads until the rest of it arrives
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
         # Start the process with PTY
         self._start_pty_process()
         
@@ -66,8 +87,17 @@ class TerminalEmulatorSession:
         self.reader_thread.start()
         logger.info(f"Started reader thread: {self.reader_thread.is_alive()}")
         
-        # Wait for process to start
-        time.sleep(1)
+        # Wait for process to start and draw its first output
+        self._wait_for_output(0, timeout=1, quiet=0.1)
+
+    @property
+    def output_buffer(self) -> str:
+        """Raw terminal output, limited to the most recent output."""
+        with self._output_ready:
+            # Collapse in place so later reads only join new chunks
+            if len(self._output_chunks) > 1:
+                self._output_chunks[:] = ["".join(self._output_chunks)]
+            return self._output_chunks[0] if self._output_chunks else ""
 
     def _start_pty_process(self):
         """Start process with PTY for direct terminal interaction."""
@@ -116,14 +146,11 @@ class TerminalEmulatorSession:
                 try:
                     ready, _, _ = select.select([self.master_fd], [], [], 0.1)
                     if ready:
-                        data = os.read(self.master_fd, 4096)
-                        if data:
-                            text = data.decode('utf-8', errors='replace')
-                            
-                            # Add to raw output buffer for compatibility
-                            self.output_buffer += text
-                            if len(self.output_buffer) > 50000:
-                                self.output_buffer = self.output_buffer[-40000:]
+                        # Read whatever is available in one go, so bursts of
+                        # output are decoded and parsed in a few large chunks
+                        data = os.read(self.master_fd, 65536)
+                        text = self._decoder.decode(data)
+                        if text:
                             
                             # Process through screen buffer for proper display
                             try:
@@ -132,6 +159,18 @@ class TerminalEmulatorSession:
                             except Exception as e:
                                 logger.error(f"Error processing data through screen buffer: {e}")
                             
+                            with self._output_ready:
+                                # Add to raw output buffer for compatibility,
+                                # trimming it once it grows past 50000 chars
+                                self._output_chunks.append(text)
+                                self._output_size += len(text)
+                                if self._output_size > 50000:
+                                    self._output_chunks[:] = ["".join(self._output_chunks)[-40000:]]
+                                    self._output_size = len(self._output_chunks[0])
+                                
+                                self._output_seq += 1
+                                self._output_ready.notify_all()
+                            
                 except (OSError, ValueError) as e:
                     # PTY closed or error
                     if hasattr(e, 'errno') and e.errno not in [5, 9]:  # 5=EIO, 9=EBADF - expected when PTY closes
@@ -149,6 +188,10 @@ class TerminalEmulatorSession:
         except Exception as e:
             logger.error(f"Fatal error in PTY reader: {e}")
         finally:
+            # Wake anyone waiting for output that will never come
+            with self._output_ready:
+                self._reader_alive = False
+                self._output_ready.notify_all()
             logger.info("PTY output reader thread ending")
 
     def send_input(self, input_text: str) -> str:
@@ -160,10 +203,12 @@ class TerminalEmulatorSession:
             if self.master_fd is not None:
                 # Send input directly to the PTY master
                 logger.info(f"Sending input to terminal: {input_text!r}")
+                seq = self._output_seq
                 os.write(self.master_fd, input_text.encode('utf-8'))
                 
-                # Give some time for the command to process the input
-                time.sleep(0.2)
+                # Give the command up to the same 0.2s to respond, returning
+                # as soon as its output settles
+                self._wait_for_output(seq, timeout=0.2, quiet=0.05)
             else:
                 logger.error("No master fd available for sending input")
             
@@ -173,6 +218,47 @@ class TerminalEmulatorSession:
             logger.error(f"Error sending input: {e}")
             return self.output_buffer
 
+    def _wait_for_output(self, since: Optional[int], timeout: float, quiet: float) -> None:
+        """Wait for the reader thread to process new output and for it to settle.
+        
+        Args:
+            since: Output sequence number observed before the wait was needed,
+                or None to only wait for output to settle
+            timeout: Maximum time in seconds to wait overall
+            quiet: Stop once no output has arrived for this many seconds
+        """
+        deadline = time.monotonic() + timeout
+        with self._output_ready:
+            # Wait for the first new output
+            while since is not None and self._output_seq == since and self.running and self._reader_alive:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._output_ready.wait(remaining)
+            
+            # Then until it goes quiet
+            while self.running and self._reader_alive:
+                seen = self._output_seq
+                wait = min(quiet, deadline - time.monotonic())
+                if wait <= 0:
+                    return
+                self._output_ready.wait(wait)
+                if self._output_seq == seen:
+                    return
+    
+    def wait_for_idle(self, quiet: float = 0.1, timeout: float = 2.0) -> str:
+        """Wait until the terminal stops receiving output.
+        
+        Args:
+            quiet: Stop once no output has arrived for this many seconds
+            timeout: Maximum time in seconds to wait overall
+            
+        Returns:
+            The raw output buffer
+        """
+        self._wait_for_output(None, timeout=timeout, quiet=quiet)
+        return self.output_buffer
+    
     def get_output(self, raw: bool = None) -> str:
         """Get the current output from the terminal."""
         if raw is True:
@@ -210,9 +296,9 @@ class TerminalEmulatorSession:
             try:
                 # Try graceful termination first
                 self.process.terminate()
-                time.sleep(0.5)
-                
-                if self.process.poll() is None:
+                try:
+                    self.process.wait(timeout=0.5)
+                except subprocess.TimeoutExpired:
                     # If still running, force kill
                     self.process.kill()
             except Exception as e:
@@ -1,12 +1,15 @@
 """Terminal manager for handling terminal sessions."""
 
+import codecs
 import logging
 import os
 import re
+import selectors
 import signal
 import subprocess
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Union
 
 import pexpect
@@ -15,8 +18,9 @@ from terminal_mcp_server.terminal_emulator import TerminalEmulatorSession, detec
 
 logger = logging.getLogger(__name__)
 
-# Regular expression to match ANSI escape sequences
-ANSI_ESCAPE_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+# Regular expression to match ANSI escape sequences, with CSI sequences
+# (by far the most common) tried first
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1B(?:\[[0-?]*[ -/]*[@-~]|[@-Z\\-_])')
 
 def strip_ansi_escape_sequences(text: str) -> str:
     """Strip ANSI escape sequences from text.
@@ -27,12 +31,22 @@ def strip_ansi_escape_sequences(text: str) -> str:
     Returns:
         The text with ANSI escape sequences removed
     """
+    # Most output has no escapes at all; the substring test is a C-level scan
+    if '\x1b' not in text:
+        return text
     return ANSI_ESCAPE_PATTERN.sub('', text)
 
 
 class TerminalSession:
     """Class representing a terminal session."""
 
+    # get_output accepts a raw override
+    _supports_raw_kwarg = True
+    
+    # Upper bound on bytes read in a single drain, so a child that writes
+    # continuously can't keep a caller spinning forever
+    MAX_READ_SIZE = 1 << 20
+
     def __init__(self, command: str, timeout: int = 30, term_type: str = "xterm-256color", 
                  dimensions: Tuple[int, int] = (36, 120), preserve_ansi: bool = True):
         """Initialize a terminal session.
@@ -47,13 +61,18 @@ class TerminalSession:
         self.command = command
         self.timeout = timeout
         self.process = None
-        self.output_buffer = ""
-        self.raw_output_buffer = ""
+        # Output is kept as lists of chunks and joined on read, so that
+        # appending doesn't copy everything accumulated so far
+        self._output_chunks: List[str] = []
+        self._raw_output_chunks: List[str] = []
         self.exit_code = None
         self.start_time = time.time()
         self.preserve_ansi = preserve_ansi
         self.term_type = term_type
         self.dimensions = dimensions
+        self._eof = False
+        self._selector = selectors.DefaultSelector()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
         
         # Start the process
         try:
@@ -69,6 +88,9 @@ class TerminalSession:
             )
             logger.info(f"Started process with command: {command}")
             
+            # Output is read straight from the PTY rather than through expect()
+            self._selector.register(self.process.child_fd, selectors.EVENT_READ)
+            
             # Try to get initial output immediately
             self._read_output()
             
@@ -76,33 +98,90 @@ class TerminalSession:
             logger.error(f"Failed to start process: {e}")
             raise
     
-    def _read_output(self) -> str:
-        """Read available output from the process without blocking.
+    @property
+    def output_buffer(self) -> str:
+        """Output read so far, with ANSI sequences stripped unless preserve_ansi."""
+        return self._join_chunks(self._output_chunks)
+    
+    @property
+    def raw_output_buffer(self) -> str:
+        """Raw output read so far."""
+        return self._join_chunks(self._raw_output_chunks)
+    
+    @staticmethod
+    def _join_chunks(chunks: List[str]) -> str:
+        """Join output chunks, collapsing them in place so later reads only join new output.
+        
+        Args:
+            chunks: The chunk list to join
+            
+        Returns:
+            The joined output
+        """
+        if len(chunks) > 1:
+            chunks[:] = ["".join(chunks)]
+        return chunks[0] if chunks else ""
+    
+    def _read_available(self, timeout: float = 0, quiet: float = 0) -> str:
+        """Read output from the PTY without going through pexpect's expect().
         
+        Args:
+            timeout: Maximum time in seconds to wait for the first output
+            quiet: Once output arrives, keep reading until none arrives for
+                this many seconds (bounded by timeout)
+            
         Returns:
             New raw output that was read
         """
-        if not self.is_running():
+        if self._eof:
             return ""
-            
-        try:
-            # Try to read any new output without blocking
-            self.process.expect("__UNLIKELY_PATTERN__", timeout=0.1)
-        except pexpect.TIMEOUT:
-            # This is expected, we just want to capture output
-            pass
-        except pexpect.EOF:
-            # Process ended
+        
+        chunks = []
+        size = 0
+        deadline = time.monotonic() + timeout
+        wait = timeout
+        while size < self.MAX_READ_SIZE and self._selector.select(wait):
+            try:
+                data = os.read(self.process.child_fd, 65536)
+            except OSError:
+                # EIO is how Linux reports a closed PTY
+                data = b""
+            if not data:
+                self._handle_eof()
+                break
+            chunks.append(self._decoder.decode(data))
+            size += len(data)
+            wait = max(0, min(quiet, deadline - time.monotonic()))
+        
+        return "".join(chunks)
+    
+    def _handle_eof(self) -> None:
+        """Record that the process has closed its end of the PTY."""
+        self._eof = True
+        self._selector.close()
+        if not self.process.isalive():
             self.exit_code = self.process.exitstatus
+    
+    def _read_output(self, timeout: float = 0, quiet: float = 0) -> str:
+        """Read available output from the process, by default without blocking.
         
-        # Get the output since last read
-        new_raw_output = self.process.before or ""
-        self.raw_output_buffer += new_raw_output
+        Args:
+            timeout: Maximum time in seconds to wait for the first output
+            quiet: Once output arrives, keep reading until none arrives for
+                this many seconds (bounded by timeout)
+            
+        Returns:
+            New raw output that was read
+        """
+        new_raw_output = self._read_available(timeout=timeout, quiet=quiet)
+        if not new_raw_output:
+            return new_raw_output
+        self._raw_output_chunks.append(new_raw_output)
         
         # Process the output based on preference
         if not self.preserve_ansi:
             new_output = strip_ansi_escape_sequences(new_raw_output)
-            self.output_buffer += new_output
+            self._output_chunks.append(new_output)
             
         return new_raw_output
     
@@ -121,21 +200,9 @@ class TerminalSession:
         # Send the input
         self.process.sendline(input_text)
         
-        # Wait for output and capture it
-        try:
-            # Use a pattern that's unlikely to be in the output to force timeout
-            # This allows us to capture whatever output is available
-            self.process.expect("__UNLIKELY_PATTERN__", timeout=1)
-        except pexpect.TIMEOUT:
-            # This is expected, we just want to capture output
-            pass
-        except pexpect.EOF:
-            # Process ended
-            self.exit_code = self.process.exitstatus
-        
-        # Get the output since last read
-        new_raw_output = self.process.before
-        self.raw_output_buffer += new_raw_output
+        # Wait up to a second for output, returning once it goes quiet
+        new_raw_output = self._read_available(timeout=1, quiet=0.05)
+        self._raw_output_chunks.append(new_raw_output)
         
         # Process the output based on preference
         if self.preserve_ansi:
@@ -143,10 +210,53 @@ class TerminalSession:
         else:
             new_output = strip_ansi_escape_sequences(new_raw_output)
         
-        self.output_buffer += new_output
+        self._output_chunks.append(new_output)
         
         return new_output
     
+    def wait_for_output(self, timeout: float, quiet: float = 0.1) -> str:
+        """Wait for the process to write output or exit.
+        
+        Returns as soon as output has arrived and then gone quiet, or the
+        process has closed the PTY, instead of sleeping for a fixed time.
+        If output is already buffered only the quiet period is waited for.
+        
+        Args:
+            timeout: Maximum time in seconds to wait for output
+            quiet: Stop once no output has arrived for this many seconds
+            
+        Returns:
+            New raw output that was read
+        """
+        if self._raw_output_chunks:
+            timeout = min(timeout, quiet)
+        return self._read_output(timeout=timeout, quiet=quiet)
+    
+    def wait_for_idle(self, quiet: float = 0.1, timeout: float = 2.0) -> str:
+        """Wait until the process stops writing output.
+        
+        Returns once no output has arrived for quiet seconds, so callers
+        don't need a fixed sleep after each input.
+        
+        Args:
+            quiet: Stop once no output has arrived for this many seconds
+            timeout: Maximum time in seconds to wait overall
+            
+        Returns:
+            New raw output that was read
+        """
+        deadline = time.monotonic() + timeout
+        chunks = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            new_raw_output = self._read_output(timeout=min(quiet, remaining), quiet=quiet)
+            if not new_raw_output:
+                break
+            chunks.append(new_raw_output)
+        return "".join(chunks)
+    
     def get_output(self, raw: bool = None) -> str:
         """Get the current output from the terminal.
         
@@ -178,42 +288,153 @@ class TerminalSession:
         
         return self.process.isalive()
     
-    def terminate(self) -> None:
-        """Terminate the process."""
-        if not self.is_running():
-            return
+    def _wait_for_exit(self, timeout: float) -> bool:
+        """Wait for the process to exit.
         
-        try:
-            # Try graceful termination first
-            self.process.terminate(force=False)
-            time.sleep(0.5)
+        Args:
+            timeout: Maximum time to wait in seconds
             
-            # If still running, force kill
-            if self.is_running():
-                self.process.terminate(force=True)
-        except Exception as e:
-            logger.error(f"Error terminating process: {e}")
-            # As a last resort
+        Returns:
+            True if the process exited within the timeout, False otherwise
+        """
+        deadline = time.monotonic() + timeout
+        while self.is_running():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    
+    def terminate(self) -> None:
+        """Terminate the process."""
+        if self.is_running():
             try:
-                if self.process.pid:
-                    os.kill(self.process.pid, signal.SIGKILL)
-            except Exception:
-                pass
-        
-        # Capture any final output
+                # Try graceful termination first, returning as soon as the child exits
+                self.process.terminate(force=False)
+                
+                # If still running after the grace period, force kill
+                if not self._wait_for_exit(0.5):
+                    self.process.terminate(force=True)
+            except Exception as e:
+                logger.error(f"Error terminating process: {e}")
+                # As a last resort
+                try:
+                    if self.process.pid:
+                        os.kill(self.process.pid, signal.SIGKILL)
+                except Exception:
+                    pass
+        
+        # Capture any final output, then close the selector even if the
+        # process exited without its EOF having been read
         self._read_output()
+        if not self._eof:
+            self._handle_eof()
         
         # Set exit code if not already set
         if self.exit_code is None and self.process.exitstatus is not None:
             self.exit_code = self.process.exitstatus
 
 
+class FinishedSession:
+    """Class representing a one-shot command that has already completed.
+    
+    Exposes the same interface as TerminalSession so the manager can treat
+    both uniformly, but the command is run without a PTY or pexpect.
+    """
+    
+    # get_output accepts a raw override
+    _supports_raw_kwarg = True
+
+    def __init__(self, command: str, timeout: int = 30, term_type: str = "xterm-256color",
+                 preserve_ansi: bool = True):
+        """Run a command to completion.
+        
+        Args:
+            command: The command to run
+            timeout: Timeout in seconds for the whole run; a command still
+                running then is killed, along with any processes it started,
+                and gets exit code -1
+            term_type: Terminal type to report in TERM, as TerminalSession does
+            preserve_ansi: Whether to preserve ANSI escape sequences in output
+        """
+        self.command = command
+        self.timeout = timeout
+        self.preserve_ansi = preserve_ansi
+        self.term_type = term_type
+        self.start_time = time.time()
+        self.exit_code = None
+        
+        env = os.environ.copy()
+        env["TERM"] = self.term_type
+        
+        # Run in a new session so that a timeout can kill the whole process
+        # group, not just bash
+        process = subprocess.Popen(
+            ["/bin/bash", "-c", command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            errors="replace",
+            env=env,
+            start_new_session=True
+        )
+        try:
+            raw_output, _ = process.communicate(timeout=timeout)
+            self.exit_code = process.returncode
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            # Collect what was written before the timeout
+            raw_output, _ = process.communicate()
+            self.exit_code = -1
+            logger.warning(f"Command timed out after {timeout}s: {command}")
+        
+        raw_output = raw_output or ""
+        self.raw_output_buffer = raw_output
+        self.output_buffer = strip_ansi_escape_sequences(raw_output)
+        logger.info(f"Ran one-shot command: {command}")
+    
+    def send_input(self, input_text: str) -> str:
+        """Send input to the terminal.
+        
+        Raises:
+            RuntimeError: Always, since the command has already finished
+        """
+        raise RuntimeError("Process is not running")
+    
+    def get_output(self, raw: bool = None) -> str:
+        """Get the output of the command.
+        
+        Args:
+            raw: Override the preserve_ansi setting if not None
+            
+        Returns:
+            The command output
+        """
+        use_raw = self.preserve_ansi if raw is None else raw
+        return self.raw_output_buffer if use_raw else self.output_buffer
+    
+    def is_running(self) -> bool:
+        """Check if the process is still running.
+        
+        Returns:
+            Always False
+        """
+        return False
+    
+    def terminate(self) -> None:
+        """Terminate the process (no-op, the command has already finished)."""
+        return
+
+
 class TerminalManager:
     """Manager for terminal sessions."""
 
     def __init__(self):
         """Initialize the terminal manager."""
-        self.sessions: Dict[str, Union[TerminalSession, TerminalEmulatorSession]] = {}
+        self.sessions: Dict[str, Union[TerminalSession, TerminalEmulatorSession, FinishedSession]] = {}
     
     def generate_session_id(self) -> str:
         """Generate a unique session ID.
@@ -225,7 +446,9 @@ class TerminalManager:
     
     def run_command(
         self, command: str, session_id: str, timeout: int = 30,
-        use_terminal_emulator: bool = False, terminal_emulator: Optional[str] = None
+        use_terminal_emulator: bool = False, terminal_emulator: Optional[str] = None,
+        interactive: bool = True, term_type: str = "xterm-256color",
+        preserve_ansi: bool = True
     ) -> Tuple[str, Optional[int], bool]:
         """Run a command in a terminal.
         
@@ -235,6 +458,18 @@ class TerminalManager:
             timeout: Timeout in seconds
             use_terminal_emulator: Whether to use a terminal emulator
             terminal_emulator: Terminal emulator to use (if None, auto-detect)
+            interactive: Whether input will be sent to the session. If False
+                (and no terminal emulator is requested) the command is run to
+                completion without a PTY; this call then blocks until it
+                finishes, and timeout bounds the whole run, killing a command
+                still running with exit code -1. Without a PTY the command's
+                output is not a terminal, so programs such as ls print
+                without color and one entry per line. Ignored when
+                use_terminal_emulator is True.
+            term_type: Terminal type to report in TERM (not used by
+                terminal emulator sessions)
+            preserve_ansi: Whether to preserve ANSI escape sequences in
+                output (not used by terminal emulator sessions)
             
         Returns:
             Tuple of (output, exit_code, running)
@@ -244,6 +479,12 @@ class TerminalManager:
             # Terminate existing session
             self.terminate_session(session_id)
         
+        # One-shot commands don't need a PTY
+        if not use_terminal_emulator and not interactive:
+            session = self._run_oneshot(command, timeout, term_type, preserve_ansi)
+            self.sessions[session_id] = session
+            return session.get_output(), session.exit_code, False
+        
         # Create new session
         if use_terminal_emulator:
             # Use terminal emulator for TUI applications
@@ -255,26 +496,15 @@ class TerminalManager:
                                              dimensions=(40, 100))  # Set to 40 rows, 100 columns
         else:
             # Use regular terminal session
-            session = TerminalSession(command, timeout)
+            session = TerminalSession(command, timeout, term_type=term_type,
+                                      preserve_ansi=preserve_ansi)
         
         self.sessions[session_id] = session
         
-        # For simple commands, wait for completion or a reasonable timeout
-        # This ensures we capture the output before returning
-        is_simple_command = not use_terminal_emulator
-        wait_time = 0
-        max_wait = 2  # Maximum seconds to wait for simple commands
-        
-        while is_simple_command and session.is_running() and wait_time < max_wait:
-            time.sleep(0.1)
-            wait_time += 0.1
-            
-            # Check if we have output already
-            output = session.get_output()
-            if output and len(output) > 0:
-                # If we have output and it's been at least 0.5 seconds, we can return
-                if wait_time >= 0.5:
-                    break
+        # For simple commands, wait until the command writes output or exits
+        # so that the output is captured before returning
+        if not use_terminal_emulator:
+            session.wait_for_output(timeout=2)
         
         # Get final output
         output = session.get_output()
@@ -283,6 +513,21 @@ class TerminalManager:
         
         return output, exit_code, running
     
+    def _run_oneshot(self, command: str, timeout: int, term_type: str = "xterm-256color",
+                     preserve_ansi: bool = True) -> FinishedSession:
+        """Run a non-interactive command to completion.
+        
+        Args:
+            command: The command to run
+            timeout: Timeout in seconds
+            term_type: Terminal type to report in TERM
+            preserve_ansi: Whether to preserve ANSI escape sequences in output
+            
+        Returns:
+            The finished session
+        """
+        return FinishedSession(command, timeout, term_type=term_type, preserve_ansi=preserve_ansi)
+    
     def send_input(self, session_id: str, input_text: str) -> Tuple[str, Optional[int], bool]:
         """Send input to a terminal session.
         
@@ -305,6 +550,31 @@ class TerminalManager:
         
         return output, exit_code, running
     
+    def wait_for_idle(self, session_id: str, quiet: float = 0.1, timeout: float = 2.0) -> Tuple[str, Optional[int], bool]:
+        """Wait until a terminal session stops writing output.
+        
+        Args:
+            session_id: The session ID
+            quiet: Stop once no output has arrived for this many seconds
+            timeout: Maximum time in seconds to wait
+            
+        Returns:
+            Tuple of (output, exit_code, running)
+        """
+        if session_id not in self.sessions:
+            raise KeyError(f"Session {session_id} not found")
+        
+        session = self.sessions[session_id]
+        
+        # Finished sessions have nothing left to wait for
+        if hasattr(session, 'wait_for_idle'):
+            session.wait_for_idle(quiet=quiet, timeout=timeout)
+        output = session.get_output()
+        exit_code = getattr(session, 'exit_code', None)
+        running = session.is_running()
+        
+        return output, exit_code, running
+    
     def get_session_state(self, session_id: str, raw_output: bool = None) -> Tuple[str, Optional[int], bool]:
         """Get the current state of a terminal session.
         
@@ -323,7 +593,7 @@ class TerminalManager:
         try:
             # Get current state with timeout protection
             if hasattr(session, 'get_output') and callable(getattr(session, 'get_output')):
-                if raw_output is not None and 'raw' in session.get_output.__code__.co_varnames:
+                if raw_output is not None and getattr(session, '_supports_raw_kwarg', False):
                     output = session.get_output(raw=raw_output)
                 else:
                     output = session.get_output()
@@ -364,9 +634,23 @@ class TerminalManager:
         return list(self.sessions.keys())
     
     def cleanup(self) -> None:
-        """Clean up all sessions."""
-        for session_id in list(self.sessions.keys()):
+        """Clean up all sessions.
+        
+        Sessions are detached from the manager first and then terminated
+        concurrently, so total cleanup time is bounded by the slowest
+        session rather than the sum of all of them.
+        """
+        sessions = list(self.sessions.items())
+        self.sessions.clear()
+        if not sessions:
+            return
+        
+        def terminate(item: Tuple[str, object]) -> None:
+            session_id, session = item
             try:
-                self.terminate_session(session_id)
+                session.terminate()
             except Exception as e:
                 logger.error(f"Error cleaning up session {session_id}: {e}")
+        
+        with ThreadPoolExecutor(max_workers=min(16, len(sessions))) as executor:
+            list(executor.map(terminate, sessions))
@@ -4,8 +4,39 @@
 import subprocess
 import sys
 import json
+import re
 import time
 
+# Command printing every kind of color and formatting that is checked
+COLORFUL_COMMAND = """
+echo -e "\\033[31mRed\\033[0m \\033[32mGreen\\033[0m \\033[33mYellow\\033[0m \\033[34mBlue\\033[0m \\033[35mMagenta\\033[0m \\033[36mCyan\\033[0m"
+echo -e "\\033[1;31mBold Red\\033[0m \\033[1;32mBold Green\\033[0m \\033[1;33mBold Yellow\\033[0m"
+echo -e "\\033[41mRed BG\\033[0m \\033[42mGreen BG\\033[0m \\033[43mYellow BG\\033[0m"
+echo -e "\\033[38;5;196mBright Red (256)\\033[0m \\033[38;5;46mBright Green (256)\\033[0m"
+echo -e "\\033[38;2;255;165;0mOrange RGB\\033[0m \\033[38;2;128;0;128mPurple RGB\\033[0m"
+echo -e "\\033[1;4;31mBold Underlined Red\\033[0m \\033[3;32mItalic Green\\033[0m"
+echo -e "\\033[7;36mReverse Cyan\\033[0m \\033[9;35mStrikethrough Magenta\\033[0m"
+""".strip()
+
+# Codes the HTML must contain, with what each one shows
+COLOR_CHECKS = [
+    ("#800000", "Dark Red"),
+    ("#008000", "Dark Green"), 
+    ("#808000", "Dark Yellow"),
+    ("#000080", "Dark Blue"),
+    ("#800080", "Dark Magenta"),
+    ("#008080", "Dark Cyan"),
+    ("font-weight: bold", "Bold formatting"),
+    ("text-decoration: underline", "Underline formatting"),
+    ("font-style: italic", "Italic formatting"),
+    ("background-color:", "Background colors"),
+    ("#ff0000", "Bright colors"),
+    ("#ff6500", "RGB colors")  # Orange RGB should be close to this
+]
+
+# Matches any of the checked codes
+COLOR_PATTERN = re.compile("|".join(re.escape(code) for code, _ in COLOR_CHECKS))
+
 def test_full_color_rendering():
     """Test that colors are fully preserved without truncation."""
     
@@ -30,13 +61,15 @@ def test_full_color_rendering():
         
         start_time = time.time()
         while time.time() - start_time < timeout:
+            # readline blocks until the server writes a line, so there is
+            # nothing to poll for; an empty line means the server has exited
             response_line = process.stdout.readline()
-            if response_line:
-                try:
-                    return json.loads(response_line.strip())
-                except json.JSONDecodeError:
-                    continue
-            time.sleep(0.1)
+            if not response_line:
+                return None
+            try:
+                return json.loads(response_line.strip())
+            except json.JSONDecodeError:
+                continue
         return None
     
     try:
@@ -59,16 +92,6 @@ def test_full_color_rendering():
         print("✅ Server initialized")
         
         # Run a command with lots of colors
-        colorful_command = """
-echo -e "\\033[31mRed\\033[0m \\033[32mGreen\\033[0m \\033[33mYellow\\033[0m \\033[34mBlue\\033[0m \\033[35mMagenta\\033[0m \\033[36mCyan\\033[0m"
-echo -e "\\033[1;31mBold Red\\033[0m \\033[1;32mBold Green\\033[0m \\033[1;33mBold Yellow\\033[0m"
-echo -e "\\033[41mRed BG\\033[0m \\033[42mGreen BG\\033[0m \\033[43mYellow BG\\033[0m"
-echo -e "\\033[38;5;196mBright Red (256)\\033[0m \\033[38;5;46mBright Green (256)\\033[0m"
-echo -e "\\033[38;2;255;165;0mOrange RGB\\033[0m \\033[38;2;128;0;128mPurple RGB\\033[0m"
-echo -e "\\033[1;4;31mBold Underlined Red\\033[0m \\033[3;32mItalic Green\\033[0m"
-echo -e "\\033[7;36mReverse Cyan\\033[0m \\033[9;35mStrikethrough Magenta\\033[0m"
-""".strip()
-        
         run_response = send_request({
             "jsonrpc": "2.0",
             "id": 2,
@@ -76,7 +99,7 @@ echo -e "\\033[7;36mReverse Cyan\\033[0m \\033[9;35mStrikethrough Magenta\\033[0
             "params": {
                 "name": "run_command",
                 "arguments": {
-                    "command": colorful_command,
+                    "command": COLORFUL_COMMAND,
                     "timeout": 15
                 }
             }
@@ -100,8 +123,24 @@ echo -e "\\033[7;36mReverse Cyan\\033[0m \\033[9;35mStrikethrough Magenta\\033[0
         
         print(f"✅ Colorful command executed, session ID: {session_id}")
         
-        # Wait a moment for command to complete
-        time.sleep(2)
+        # Wait for the command to complete, polling its state for up to 2
+        # seconds instead of always sleeping for that long
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            state_response = send_request({
+                "jsonrpc": "2.0",
+                "id": 0,
+                "method": "tools/call",
+                "params": {
+                    "name": "get_session",
+                    "arguments": {"session_id": session_id}
+                }
+            })
+            if not state_response or "result" not in state_response:
+                break
+            if state_response["result"]["content"][0]["text"].endswith("Running: False"):
+                break
+            time.sleep(0.1)
         
         # Test get_session_html with full output
         html_response = send_request({
@@ -124,25 +163,13 @@ echo -e "\\033[7;36mReverse Cyan\\033[0m \\033[9;35mStrikethrough Magenta\\033[0
         
         html_content = html_response["result"]["content"][0]["text"]
         
-        # Verify HTML content has colors
-        color_checks = [
-            ("#800000", "Dark Red"),
-            ("#008000", "Dark Green"), 
-            ("#808000", "Dark Yellow"),
-            ("#000080", "Dark Blue"),
-            ("#800080", "Dark Magenta"),
-            ("#008080", "Dark Cyan"),
-            ("font-weight: bold", "Bold formatting"),
-            ("text-decoration: underline", "Underline formatting"),
-            ("font-style: italic", "Italic formatting"),
-            ("background-color:", "Background colors"),
-            ("#ff0000", "Bright colors"),
-            ("#ff6500", "RGB colors")  # Orange RGB should be close to this
-        ]
+        # Verify HTML content has colors, finding every checked code in a
+        # single pass over the HTML
+        seen_codes = set(COLOR_PATTERN.findall(html_content))
         
         found_colors = 0
-        for color_code, description in color_checks:
-            if color_code in html_content:
+        for color_code, description in COLOR_CHECKS:
+            if color_code in seen_codes:
                 print(f"✅ Found {description}: {color_code}")
                 found_colors += 1
             else:
@@ -150,7 +177,7 @@ echo -e "\\033[7;36mReverse Cyan\\033[0m \\033[9;35mStrikethrough Magenta\\033[0
         
         print(f"\n✅ HTML generated successfully!")
         print(f"HTML length: {len(html_content)} characters")
-        print(f"Colors found: {found_colors}/{len(color_checks)}")
+        print(f"Colors found: {found_colors}/{len(COLOR_CHECKS)}")
         
         # Save to file for inspection
         with open("full_color_test.html", "w") as f:
@@ -13,6 +13,24 @@ def send_mcp_request(server, request):
     response = json.loads(server.stdout.readline())
     return response
 
+def get_screen(server, session_id):
+    """Get the current screen of a session through the get_output tool"""
+    output_req = {
+        "jsonrpc": "2.0", "id": 0, "method": "tools/call",
+        "params": {"name": "get_output", "arguments": {"session_id": session_id}}
+    }
+    response = send_mcp_request(server, output_req)
+    return response["result"]["content"][0]["text"].split("Output:\n", 1)[-1]
+
+def wait_for(server, session_id, predicate, timeout, interval=0.05):
+    """Poll the screen until predicate(screen) holds, for at most timeout seconds"""
+    deadline = time.monotonic() + timeout
+    screen = get_screen(server, session_id)
+    while not predicate(screen) and time.monotonic() < deadline:
+        time.sleep(interval)
+        screen = get_screen(server, session_id)
+    return screen
+
 def test_full_vim_workflow():
     """Test: Open terminal -> vim -> write 'Dumb dumb dumber' -> save -> cat file"""
     print("=== Testing Full Vim Workflow ===")
@@ -26,8 +44,6 @@ def test_full_vim_workflow():
     )
     
     try:
-        time.sleep(1)
-        
         # 1. Start shell
         print("1. Starting shell...")
         start_req = {
@@ -37,7 +53,7 @@ def test_full_vim_workflow():
         resp = send_mcp_request(server, start_req)
         session_id = resp["result"]["content"][0]["text"].split("Session ID: ")[1].split("\n")[0]
         print(f"   ✓ Shell started: {session_id}")
-        time.sleep(2)
+        wait_for(server, session_id, lambda screen: screen.strip(), timeout=2)
         
         # 2. Open vim to create new file
         print("2. Opening vim with file 'testfile.txt'...")
@@ -47,70 +63,43 @@ def test_full_vim_workflow():
         }
         resp = send_mcp_request(server, vim_req)
         print("   ✓ Vim command sent")
-        time.sleep(2)
-        
-        # 3. Enter insert mode
-        print("3. Entering insert mode (press 'i')...")
-        insert_req = {
-            "jsonrpc": "2.0", "id": 3, "method": "tools/call",
-            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "i"}}
-        }
-        resp = send_mcp_request(server, insert_req)
-        print("   ✓ Insert mode activated")
-        time.sleep(0.5)
+        wait_for(server, session_id, lambda screen: '"testfile.txt"' in screen, timeout=2)
         
-        # 4. Type the text
-        print("4. Typing 'Dumb dumb dumber'...")
+        # 3. Type the text in insert mode; the keys go in one write rather
+        #    than one request per step
+        print("3. Typing 'Dumb dumb dumber' in insert mode (i + text)...")
         type_req = {
-            "jsonrpc": "2.0", "id": 4, "method": "tools/call",
-            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "Dumb dumb dumber"}}
+            "jsonrpc": "2.0", "id": 3, "method": "tools/call",
+            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "iDumb dumb dumber"}}
         }
         resp = send_mcp_request(server, type_req)
         print("   ✓ Text typed")
-        time.sleep(0.5)
+        wait_for(server, session_id, lambda screen: "Dumb dumb dumber" in screen, timeout=1)
         
-        # 5. Exit insert mode (Escape)
-        print("5. Exiting insert mode (Escape)...")
-        escape_req = {
-            "jsonrpc": "2.0", "id": 5, "method": "tools/call", 
-            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "\\x1b"}}
-        }
-        resp = send_mcp_request(server, escape_req)
-        print("   ✓ Escaped insert mode")
-        time.sleep(0.5)
-        
-        # 6. Save and quit (:wq)
-        print("6. Saving and quitting (:wq)...")
+        # 4. Leave insert mode, save and quit (Escape + :wq + Enter)
+        print("4. Saving and quitting (Escape + :wq + Enter)...")
         save_req = {
-            "jsonrpc": "2.0", "id": 6, "method": "tools/call",
-            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": ":wq"}}
+            "jsonrpc": "2.0", "id": 4, "method": "tools/call",
+            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "\\x1b:wq\\r"}}
         }
         resp = send_mcp_request(server, save_req)
-        time.sleep(0.5)
-        
-        # 7. Press Enter to execute save command
-        print("7. Pressing Enter...")
-        enter_req = {
-            "jsonrpc": "2.0", "id": 7, "method": "tools/call",
-            "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "\\r"}}
-        }
-        resp = send_mcp_request(server, enter_req)
         print("   ✓ File saved and vim exited")
-        time.sleep(2)
+        # vim has exited once the shell prompt is back on the last line
+        wait_for(server, session_id, lambda screen: screen.rstrip().endswith(("$", "#")), timeout=2)
         
-        # 8. Cat the file to verify content
-        print("8. Displaying file content with 'cat testfile.txt'...")
+        # 5. Cat the file to verify content
+        print("5. Displaying file content with 'cat testfile.txt'...")
         cat_req = {
-            "jsonrpc": "2.0", "id": 8, "method": "tools/call",
+            "jsonrpc": "2.0", "id": 5, "method": "tools/call",
             "params": {"name": "send_input", "arguments": {"session_id": session_id, "input": "cat testfile.txt\\r"}}
         }
         resp = send_mcp_request(server, cat_req)
-        time.sleep(1)
+        wait_for(server, session_id, lambda screen: "Dumb dumb dumber" in screen, timeout=1)
         
-        # 9. Get final output to see everything
-        print("9. Getting final terminal output...")
+        # 6. Get final output to see everything
+        print("6. Getting final terminal output...")
         output_req = {
-            "jsonrpc": "2.0", "id": 9, "method": "tools/call",
+            "jsonrpc": "2.0", "id": 6, "method": "tools/call",
             "params": {"name": "get_output", "arguments": {"session_id": session_id}}
         }
         resp = send_mcp_request(server, output_req)
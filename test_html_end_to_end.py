@@ -4,6 +4,8 @@
 import subprocess
 import sys
 import json
+import queue
+import threading
 import time
 
 def test_html_functionality():
@@ -21,6 +23,18 @@ def test_html_functionality():
         cwd="/home/debasish/work/talentica/terminal-mcp-server"
     )
     
+    # Read the server's output on a thread, so waiting for a response blocks
+    # on the queue and can give up once the timeout passes
+    responses = queue.Queue()
+    
+    def read_responses():
+        """Queue each line the server writes, then None once it exits."""
+        for line in iter(process.stdout.readline, ""):
+            responses.put(line)
+        responses.put(None)
+    
+    threading.Thread(target=read_responses, daemon=True).start()
+    
     def send_request(request, timeout=5):
         """Send a request and get response."""
         request_json = json.dumps(request)
@@ -29,16 +43,20 @@ def test_html_functionality():
         process.stdin.write(request_json + "\n")
         process.stdin.flush()
         
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            response_line = process.stdout.readline()
-            if response_line:
-                try:
-                    return json.loads(response_line.strip())
-                except json.JSONDecodeError:
-                    continue
-            time.sleep(0.1)
-        return None
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                response_line = responses.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if response_line is None:
+                # The server has exited; leave the marker for later requests
+                responses.put(None)
+                return None
+            try:
+                return json.loads(response_line.strip())
+            except json.JSONDecodeError:
+                continue
     
     try:
         # Initialize
@@ -29,13 +29,15 @@ def test_windsurf_version():
         
         start_time = time.time()
         while time.time() - start_time < timeout:
+            # readline blocks until the server writes a line, so there is
+            # nothing to poll for; an empty line means the server has exited
             response_line = process.stdout.readline()
-            if response_line:
-                try:
-                    return json.loads(response_line.strip())
-                except json.JSONDecodeError:
-                    continue
-            time.sleep(0.1)
+            if not response_line:
+                return None
+            try:
+                return json.loads(response_line.strip())
+            except json.JSONDecodeError:
+                continue
         return None
     
     try:
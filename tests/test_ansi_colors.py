@@ -0,0 +1,92 @@
+"""Tests for the ANSI color helpers."""
+
+import unittest
+
+from terminal_mcp_server.ansi_colors import (
+    DEFAULT_SGR_STATE, PALETTE_256, escape_html_text, get_256_color, get_rgb_color, parse_csi_params,
+    parse_sgr_params, rgb_to_hex
+)
+
+
+class TestParseCsiParams(unittest.TestCase):
+    """Test the parse_csi_params function."""
+
+    def test_parse(self):
+        """Test parsing regular, empty, private and malformed parameters."""
+        self.assertEqual(parse_csi_params("12;;3"), (12, 0, 3))
+        self.assertEqual(parse_csi_params("?1049", strip_private=True), (1049,))
+        self.assertEqual(parse_csi_params("?1049"), ())
+        self.assertEqual(parse_csi_params(""), ())
+        self.assertEqual(parse_csi_params("1;x"), ())
+
+
+class TestGet256Color(unittest.TestCase):
+    """Test the get_256_color function."""
+
+    def test_palette(self):
+        """Test standard, color cube and grayscale entries."""
+        self.assertEqual(len(PALETTE_256), 256)
+        self.assertEqual(get_256_color(9), "#FF0000")
+        self.assertEqual(get_256_color(196), "#ff0000")
+        self.assertEqual(get_256_color(232), "#080808")
+        self.assertEqual(get_256_color(255), "#eeeeee")
+        self.assertEqual(get_256_color(300), "#ffffff")
+
+
+class TestRgbToHex(unittest.TestCase):
+    """Test the rgb_to_hex and get_rgb_color functions."""
+
+    def test_colors_are_interned(self):
+        """Test that each color's hex string is built once and shared."""
+        self.assertEqual(rgb_to_hex(255, 128, 0), "#ff8000")
+        self.assertIs(rgb_to_hex(255, 128, 0), rgb_to_hex(255, 128, 0))
+        self.assertIs(get_rgb_color(300, 128, -5), rgb_to_hex(255, 128, 0))
+
+
+class TestEscapeHtmlText(unittest.TestCase):
+    """Test the escape_html_text function."""
+
+    def test_escape(self):
+        """Test that every special character is escaped exactly once."""
+        self.assertEqual(escape_html_text("<a href='x'>&amp;\"</a>"),
+                         "&lt;a href=&#39;x&#39;&gt;&amp;amp;&quot;&lt;/a&gt;")
+
+
+class TestParseSgrParams(unittest.TestCase):
+    """Test the parse_sgr_params function."""
+
+    def test_attributes_and_colors(self):
+        """Test combined attribute and color codes."""
+        # Execute
+        state = parse_sgr_params("1;4;31;48;5;196")
+
+        # Assert
+        self.assertTrue(state["bold"])
+        self.assertTrue(state["underline"])
+        self.assertEqual(state["fg_color"], "#FF0000")
+        self.assertEqual(state["bg_color"], "#ff0000")
+
+    def test_reset(self):
+        """Test that an empty parameter string resets everything."""
+        self.assertEqual(parse_sgr_params(""), DEFAULT_SGR_STATE)
+        self.assertEqual(parse_sgr_params("1;0"), DEFAULT_SGR_STATE)
+
+    def test_private_marker_resets(self):
+        """Test that parameters with a private marker are treated as a reset."""
+        self.assertEqual(parse_sgr_params("?5"), DEFAULT_SGR_STATE)
+
+    def test_returns_fresh_state(self):
+        """Test that cached results are not shared between callers."""
+        # Setup
+        state = parse_sgr_params("1")
+
+        # Execute
+        state["bold"] = False
+
+        # Assert
+        self.assertTrue(parse_sgr_params("1")["bold"])
+        self.assertIsNone(DEFAULT_SGR_STATE["fg_color"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Tests for the ANSI to HTML converter."""
+
+import unittest
+from unittest.mock import patch
+
+from terminal_mcp_server.ansi_to_html import AnsiToHtmlConverter, escape_line_text
+
+
+class TestAnsiToHtmlConverter(unittest.TestCase):
+    """Test the AnsiToHtmlConverter class."""
+
+    def test_convert_line_escapes_plain_text(self):
+        """Test that plain text runs are HTML escaped and control characters dropped."""
+        # Setup
+        converter = AnsiToHtmlConverter()
+
+        # Execute
+        html = converter.convert_line_to_html("a<b>&\t\"c'\x07\x1b\r")
+
+        # Assert
+        self.assertEqual(html, "a&lt;b&gt;&amp;    &quot;c&#39;\r")
+
+    def test_convert_line_styles_and_skips_escapes(self):
+        """Test that SGR opens spans and other escapes are skipped."""
+        # Setup
+        converter = AnsiToHtmlConverter()
+
+        # Execute
+        html = converter.convert_line_to_html("\x1b]0;title\x07\x1b[31mred\x1bM\x1b[2Aok")
+
+        # Assert
+        self.assertEqual(html, '<span style="color: #800000">redok</span>')
+
+    def test_style_computed_once_per_state(self):
+        """Test that repeated formatting states reuse the cached style."""
+        # Setup
+        converter = AnsiToHtmlConverter()
+
+        # Execute
+        with patch.object(converter, "get_current_style", wraps=converter.get_current_style) as get_style:
+            converter.convert_to_html("\x1b[32mok\x1b[0m\n\x1b[32mok\x1b[0m\x1b[1;1H")
+
+        # Assert
+        self.assertEqual(get_style.call_count, 2)
+        self.assertEqual(len(converter.style_cache), 2)
+
+    def test_consecutive_sgr_sequences_share_one_span(self):
+        """Test that spans only change where styled text is written."""
+        # Setup
+        converter = AnsiToHtmlConverter()
+
+        # Execute
+        html = converter.convert_line_to_html("\x1b[0m\x1b[47m\x1b[30mab\x1b[0m")
+
+        # Assert
+        self.assertEqual(html, '<span style="color: #000000; background-color: #C0C0C0">ab</span>')
+
+    def test_only_text_between_escapes_is_escaped(self):
+        """Test that back to back escapes don't escape the empty text between them."""
+        # Setup
+        converter = AnsiToHtmlConverter()
+
+        # Execute
+        with patch("terminal_mcp_server.ansi_to_html.escape_line_text",
+                   wraps=escape_line_text) as escape:
+            converter.convert_line_to_html("\x1b[0m\x1b[1m\x1b[31mok\x1b[0m\x1b[K")
+
+        # Assert
+        escape.assert_called_once_with("ok")
+
+    def test_plain_text_skips_the_parser(self):
+        """Test that text without escapes is only escaped, not parsed line by line."""
+        # Setup
+        converter = AnsiToHtmlConverter()
+
+        # Execute
+        with patch.object(converter, "convert_line_to_html") as convert_line:
+            html = converter.convert_to_html("a<b\n\tc\x07")
+
+        # Assert
+        convert_line.assert_not_called()
+        self.assertIn('<pre class="terminal-content">a&lt;b\n    c</pre>', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
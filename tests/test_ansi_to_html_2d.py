@@ -0,0 +1,165 @@
+"""Tests for the 2D ANSI to HTML renderer."""
+
+import unittest
+from unittest.mock import patch
+
+from terminal_mcp_server.ansi_to_html_2d import BLANK_CELL, DEFAULT_STYLE, Terminal2DRenderer, convert_ansi_to_html_2d
+
+
+class TestTerminal2DRenderer(unittest.TestCase):
+    """Test the Terminal2DRenderer class."""
+
+    def test_screen_arrays(self):
+        """Test that characters and styles are stored as parallel rows."""
+        # Setup
+        renderer = Terminal2DRenderer(width=4, height=2)
+
+        # Execute
+        renderer.process_text("\x1b[31mab")
+
+        # Assert
+        self.assertEqual(renderer.chars, ["ab  ", "    "])
+        self.assertEqual(renderer.styles[0][0].fg_color, "#800000")
+        self.assertIs(renderer.styles[0][2], DEFAULT_STYLE)
+        self.assertEqual(renderer.cell(0, 0).char, "a")
+        self.assertEqual(renderer.cell(0, 0).fg_color, "#800000")
+        self.assertEqual(renderer.cell(1, 0), BLANK_CELL)
+        self.assertEqual(renderer.screen[0][:2], [renderer.cell(0, 0), renderer.cell(0, 1)])
+
+    def test_cells_are_immutable(self):
+        """Test that cells cannot be modified in place."""
+        with self.assertRaises(AttributeError):
+            BLANK_CELL.char = "x"
+
+    def test_identical_styles_are_interned(self):
+        """Test that cells written in the same style share one style."""
+        # Setup
+        renderer = Terminal2DRenderer(width=4, height=2)
+
+        # Execute
+        renderer.process_text("\x1b[1;32maa\x1b[0ma")
+
+        # Assert
+        row = renderer.styles[0]
+        self.assertIs(row[0], row[1])
+        self.assertIsNot(row[1], row[2])
+        self.assertIs(row[2], DEFAULT_STYLE)
+
+
+    def test_render_row_groups_styled_runs(self):
+        """Test that a run of identically styled cells renders as one span."""
+        # Setup
+        renderer = Terminal2DRenderer(width=6, height=1)
+        renderer.process_text("\x1b[31ma<b\x1b[0mc")
+
+        # Execute
+        html = renderer.render_row_to_html(0)
+
+        # Assert
+        self.assertEqual(html.count("<span"), 2)
+        self.assertIn(">a&lt;b</span>", html)
+        self.assertIn('<span style="color: #C0C0C0">c  </span>', html)
+        self.assertEqual(len(renderer.style_cache), 2)
+
+    def test_render_uniform_rows(self):
+        """Test that blank and single-style rows render as one span."""
+        # Setup
+        renderer = Terminal2DRenderer(width=4, height=2)
+        renderer.process_text("\x1b[31mab<d")
+
+        # Execute
+        styled = renderer.render_row_to_html(0)
+        blank = renderer.render_row_to_html(1)
+
+        # Assert
+        self.assertEqual(styled, '<span style="color: #800000">ab&lt;d</span>')
+        self.assertEqual(blank, '<span style="color: #C0C0C0">    </span>')
+
+    def test_sgr_transitions_are_cached(self):
+        """Test that repeated SGR sequences reuse the cached style."""
+        # Setup
+        renderer = Terminal2DRenderer(width=8, height=1)
+        renderer.process_text("\x1b[1m\x1b[31ma\x1b[0;4;38;5;208mc\x1b[0m")
+
+        # Execute
+        renderer.process_text("\x1b[1m\x1b[31mb\x1b[0;4;38;5;208md")
+
+        # Assert
+        self.assertIs(renderer.styles[0][0], renderer.styles[0][2])
+        self.assertIs(renderer.styles[0][1], renderer.styles[0][3])
+        self.assertEqual(renderer.current_fg, "#ff6600")
+        self.assertTrue(renderer.current_underline)
+        self.assertFalse(renderer.current_bold)
+        self.assertEqual(len(renderer.sgr_transitions), 4)
+
+
+    def test_no_escape_reaches_plain_text(self):
+        """Test that every kind of escape sequence is consumed by the splitter."""
+        # Setup
+        renderer = Terminal2DRenderer(width=20, height=2)
+        text = "\x1b]0;title\x07a\x1b(Bb\x1b[>cc\x1b=d\x1b]2;t\x1b\\e\x1b"
+
+        # Execute
+        with patch.object(renderer, "process_plain_text", wraps=renderer.process_plain_text) as plain:
+            renderer.process_text(text)
+
+        # Assert
+        chunks = [call.args[0] for call in plain.call_args_list]
+        self.assertEqual("".join(chunks), "abcde")
+        self.assertFalse(any("\x1b" in chunk for chunk in chunks))
+
+
+    def test_render_only_dirty_rows(self):
+        """Test that a second render only re-renders rows written since the first."""
+        # Setup
+        renderer = Terminal2DRenderer(width=6, height=3)
+        renderer.process_text("one\r\ntwo")
+        first = renderer.render_to_html()
+
+        # Execute
+        renderer.process_text("\x1b[3;1Hthree")
+        with patch.object(renderer, "render_row_to_html", wraps=renderer.render_row_to_html) as render_row:
+            second = renderer.render_to_html()
+
+        # Assert
+        render_row.assert_called_once_with(2)
+        self.assertNotIn("three", first)
+        self.assertIn("one", second)
+        self.assertIn("three", second)
+        self.assertEqual(second, convert_ansi_to_html_2d("one\r\ntwo\x1b[3;1Hthree", width=6, height=3))
+
+    def test_redrawn_rows_are_not_rerendered(self):
+        """Test that rows rewritten with the same content reuse their rendered HTML."""
+        # Setup
+        renderer = Terminal2DRenderer(width=6, height=3)
+        renderer.process_text("\x1b[31mone\x1b[0m\r\ntwo")
+        first = renderer.render_to_html()
+
+        # Execute
+        with patch.object(renderer, "render_row_to_html", wraps=renderer.render_row_to_html) as render_row:
+            renderer.process_text("\x1b[H\x1b[31mone\x1b[0m\r\ntwo\x1b[1;3H\x1b[32me")
+            second = renderer.render_to_html()
+
+        # Assert
+        render_row.assert_called_once_with(0)
+        self.assertNotEqual(second, first)
+        self.assertEqual(second, convert_ansi_to_html_2d(
+            "\x1b[31mone\x1b[0m\r\ntwo\x1b[1;3H\x1b[32me", width=6, height=3))
+
+
+    def test_blank_rows_are_not_rerendered(self):
+        """Test that blank rows reuse the HTML rendered for them up front."""
+        # Setup
+        renderer = Terminal2DRenderer(width=6, height=3)
+
+        # Execute
+        with patch.object(renderer, "render_row_to_html", wraps=renderer.render_row_to_html) as render_row:
+            blank = renderer.render_to_html()
+
+        # Assert
+        render_row.assert_not_called()
+        self.assertEqual(blank, convert_ansi_to_html_2d("", width=6, height=3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Tests for the linear ANSI to HTML converter."""
+
+import unittest
+
+from terminal_mcp_server.ansi_to_html_linear import LinearAnsiToHtmlConverter, convert_ansi_to_html_linear, html_envelope
+
+
+def terminal_content(html):
+    """Extract the terminal content from a converted HTML document."""
+    return html.split('<pre class="terminal-content">', 1)[1].rsplit("</pre>", 1)[0]
+
+
+class TestConvertAnsiToHtmlLinear(unittest.TestCase):
+    """Test the convert_ansi_to_html_linear function."""
+
+    def test_plain_text_is_escaped(self):
+        """Test HTML escaping, tab expansion and skipped cursor sequences."""
+        # Execute
+        html = convert_ansi_to_html_linear("a<b>\t&\x1b[2J\x1b[Hc")
+
+        # Assert
+        self.assertEqual(terminal_content(html), "a&lt;b&gt;    &amp;c")
+
+    def test_consecutive_sgr_sequences_share_one_span(self):
+        """Test that spans only change where styled text is written."""
+        # Execute
+        html = convert_ansi_to_html_linear("\x1b[31m\x1b[0m\x1b[32mok\x1b[0m")
+
+        # Assert
+        self.assertEqual(terminal_content(html), '<span style="color: #008000">ok</span>')
+
+
+    def test_document_is_built_once_per_title(self):
+        """Test that the HTML around the content is reused between conversions."""
+        # Setup
+        convert_ansi_to_html_linear("first", "Envelope")
+        hits = html_envelope.cache_info().hits
+
+        # Execute
+        html = convert_ansi_to_html_linear("\x1b[1msecond", "Envelope")
+
+        # Assert
+        self.assertEqual(html_envelope.cache_info().hits, hits + 1)
+        self.assertIn("<title>Envelope</title>", html)
+        self.assertTrue(html.endswith("</pre>\n    </div>\n</body>\n</html>"))
+
+class TestConvertAppended(unittest.TestCase):
+    """Test the LinearAnsiToHtmlConverter.convert_appended method."""
+
+    def test_matches_full_conversion(self):
+        """Test conversion of growing text, including an escape split between calls."""
+        # Setup
+        converter = LinearAnsiToHtmlConverter()
+        text = "a\x1b[31mred\x1b[1;32m bold green\x1b[0m plain"
+
+        # Execute
+        results = [converter.convert_appended(text[:end]) for end in (2, 5, 14, 20, len(text))]
+
+        # Assert
+        expected = [convert_ansi_to_html_linear(text[:end]) for end in (2, 5, 14, 20, len(text))]
+        self.assertEqual(results, expected)
+        self.assertIn("\x1b", terminal_content(results[0]))
+
+    def test_other_text_is_converted_from_scratch(self):
+        """Test that text not extending the previous text resets the state."""
+        # Setup
+        converter = LinearAnsiToHtmlConverter()
+        converter.convert_appended("\x1b[31mred")
+
+        # Execute
+        html = converter.convert_appended("plain")
+
+        # Assert
+        self.assertEqual(terminal_content(html), "plain")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Tests for the ANSI to plain text converters."""
+
+import unittest
+from unittest.mock import patch
+
+from terminal_mcp_server.ansi_to_text_2d import Terminal2DTextRenderer, convert_ansi_to_text_2d, convert_ansi_to_text_linear
+
+
+class TestConvertAnsiToText2D(unittest.TestCase):
+    """Test the convert_ansi_to_text_2d function."""
+
+    def test_cursor_positioning(self):
+        """Test that text is placed according to cursor movement."""
+        # Execute
+        text = convert_ansi_to_text_2d("\x1b[2;3Hhello\x1b[1;1H\x1b[1;32mtop\x1b[0m", width=10, height=3)
+
+        # Assert
+        self.assertEqual(text, "top\n  hello")
+
+    def test_skips_osc_and_simple_escapes(self):
+        """Test that OSC and two-character escapes produce no output."""
+        # Execute
+        text = convert_ansi_to_text_2d("\x1b]0;title\x07\x1b=\x1b(Bdone", width=10, height=3)
+
+        # Assert
+        self.assertEqual(text, "done")
+
+    def test_long_run_wraps_and_stops_at_bottom(self):
+        """Test that a printable run wraps at the margin and is dropped past the last row."""
+        # Execute
+        text = convert_ansi_to_text_2d("\x1b[1;3Habcdefghijklmnop", width=5, height=3)
+
+        # Assert
+        self.assertEqual(text, "  abc\ndefgh\nijklm")
+
+
+class TestRenderAppended(unittest.TestCase):
+    """Test the Terminal2DTextRenderer.render_appended method."""
+
+    def test_matches_full_rendering(self):
+        """Test rendering growing text, including escapes split between calls."""
+        # Setup
+        renderer = Terminal2DTextRenderer(width=10, height=3)
+        text = "one\x1b]0;title\x1b\\\r\n\x1b[2;5Htwo\x1b[1;1H\x1b[32mtop"
+        ends = (5, 12, 14, 20, 24, 31, len(text))
+
+        # Execute
+        results = [renderer.render_appended(text[:end]) for end in ends]
+
+        # Assert
+        self.assertEqual(results, [convert_ansi_to_text_2d(text[:end], width=10, height=3) for end in ends])
+
+    def test_processes_only_new_text(self):
+        """Test that appended text is processed from where the previous call stopped."""
+        # Setup
+        renderer = Terminal2DTextRenderer(width=10, height=3)
+        renderer.render_appended("first\r\n")
+
+        # Execute
+        with patch.object(renderer, "process_text", wraps=renderer.process_text) as process_text:
+            text = renderer.render_appended("first\r\nsecond")
+
+        # Assert
+        process_text.assert_called_once_with("first\r\nsecond", len("first\r\n"), final=False)
+        self.assertEqual(text, "first\nsecond")
+
+
+class TestConvertAnsiToTextLinear(unittest.TestCase):
+    """Test the convert_ansi_to_text_linear function."""
+
+    def test_strip(self):
+        """Test that all escape sequences are removed."""
+        # Execute
+        text = convert_ansi_to_text_linear("\x1b]0;title\x07\x1b[31mred\x1b[0m\x1b=")
+
+        # Assert
+        self.assertEqual(text, "red")
+
+    def test_plain_text_is_returned_as_is(self):
+        """Test that text without escapes is returned without being scanned again."""
+        # Setup
+        plain = "line one\r\nline two\r\n"
+
+        # Execute
+        text = convert_ansi_to_text_linear(plain)
+
+        # Assert
+        self.assertIs(text, plain)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Tests for the MCP server request handling."""
+
+import asyncio
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from terminal_mcp_server.ansi_to_html_linear import LinearAnsiToHtmlConverter, convert_ansi_to_html_linear
+from terminal_mcp_server.main import MCPServer
+from terminal_mcp_server.terminal_manager import TerminalManager
+
+
+def call_tool(server, name, **arguments):
+    """Call a tool on the server and return the text of its result."""
+    request = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+               "params": {"name": name, "arguments": arguments}}
+    response = asyncio.run(server.handle_request(request))
+    return response["result"]["content"][0]["text"]
+
+
+class TestMCPServer(unittest.TestCase):
+    """Test the MCPServer class."""
+
+    def setUp(self):
+        """Set up a server with its own terminal manager."""
+        with patch("signal.signal"):
+            self.server = MCPServer()
+        self.server.terminal_manager = TerminalManager()
+        self.session = MagicMock()
+        self.session.get_output.return_value = "\x1b[32mok\x1b[0m"
+        self.server.terminal_manager.sessions["s1"] = self.session
+
+    def test_get_session_html_reuses_unchanged_output(self):
+        """Test that HTML is only converted again once the output changes."""
+        # Execute
+        with patch.object(LinearAnsiToHtmlConverter, "convert_appended", autospec=True,
+                          side_effect=lambda converter, output, title: f"<{output}>") as convert:
+            first = call_tool(self.server, "get_session_html", session_id="s1")
+            second = call_tool(self.server, "get_session_html", session_id="s1")
+            self.session.get_output.return_value = "more"
+            third = call_tool(self.server, "get_session_html", session_id="s1")
+
+        # Assert
+        self.assertEqual(convert.call_count, 2)
+        self.assertEqual(first, second)
+        self.assertEqual(third, "<more>")
+
+    def test_get_session_html_converts_appended_output(self):
+        """Test that output appended between polls is converted like the whole output."""
+        # Setup
+        first = call_tool(self.server, "get_session_html", session_id="s1")
+        converter = self.server._html_converters["s1"]
+        self.session.get_output.return_value += " \x1b[1mmore"
+
+        # Execute
+        with patch.object(converter, "convert_text", wraps=converter.convert_text) as convert_text:
+            second = call_tool(self.server, "get_session_html", session_id="s1")
+
+        # Assert
+        self.assertNotEqual(first, second)
+        self.assertEqual(second, convert_ansi_to_html_linear("\x1b[32mok\x1b[0m \x1b[1mmore"))
+        self.assertEqual(convert_text.call_args_list[0].args[1], len("\x1b[32mok\x1b[0m"))
+
+    def test_failed_conversion_drops_converter(self):
+        """Test that a conversion that raises doesn't leave the converter out of step."""
+        # Setup
+        call_tool(self.server, "get_session_html", session_id="s1")
+        converter = self.server._html_converters["s1"]
+        self.session.get_output.return_value += " \x1b[1mmore"
+
+        # Execute
+        with patch.object(converter, "convert_text", side_effect=RuntimeError("boom")):
+            fallback = call_tool(self.server, "get_session_html", session_id="s1")
+        html = call_tool(self.server, "get_session_html", session_id="s1")
+
+        # Assert
+        self.assertIn("Error converting ANSI to HTML: boom", fallback)
+        self.assertIsNot(self.server._html_converters["s1"], converter)
+        self.assertEqual(html, convert_ansi_to_html_linear("\x1b[32mok\x1b[0m \x1b[1mmore"))
+
+    def test_get_session_text_caches_per_layout(self):
+        """Test that the 2D and linear text views are cached separately."""
+        # Execute
+        layout_2d = call_tool(self.server, "get_session_text", session_id="s1")
+        linear = call_tool(self.server, "get_session_text", session_id="s1", use_2d_layout=False)
+        again = call_tool(self.server, "get_session_text", session_id="s1")
+
+        # Assert
+        self.assertEqual(layout_2d, "ok")
+        self.assertEqual(linear, "ok")
+        self.assertEqual(again, layout_2d)
+        self.assertEqual(len(self.server._render_cache["s1"]), 2)
+
+    def test_reused_session_id_drops_cached_output(self):
+        """Test that replacing or terminating a session drops what was cached for it."""
+        # Setup
+        self.server.terminal_manager.sessions["s2"] = self.session
+        for session_id in ("s1", "s2"):
+            call_tool(self.server, "get_session_html", session_id=session_id)
+            call_tool(self.server, "get_session_text", session_id=session_id)
+
+        # Execute
+        output = call_tool(self.server, "run_command", command="echo new", session_id="s1", interactive=False)
+        html = call_tool(self.server, "get_session_html", session_id="s1")
+        call_tool(self.server, "terminate_session", session_id="s2")
+
+        # Assert
+        self.assertIn("new", output)
+        self.assertIn("new", html)
+        self.assertNotIn("ok", html)
+        self.assertNotIn("s1", self.server._text_renderers)
+        for cache in (self.server._render_cache, self.server._html_converters, self.server._text_renderers):
+            self.assertNotIn("s2", cache)
+
+    def test_write_message_serializes_once(self):
+        """Test that a response is serialized once and written as one line."""
+        # Setup
+        response = {"jsonrpc": "2.0", "id": 1, "result": {}}
+
+        # Execute
+        with patch("terminal_mcp_server.main.json.dumps", wraps=json.dumps) as dumps, \
+                patch("sys.stdout") as stdout:
+            self.server._write_message(response)
+
+        # Assert
+        dumps.assert_called_once_with(response)
+        stdout.write.assert_called_once_with(json.dumps(response) + "\n")
+        stdout.flush.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Tests for the terminal screen buffer."""
+
+import unittest
+
+from terminal_mcp_server.screen_buffer import TerminalScreenBuffer
+
+
+class TestTerminalScreenBuffer(unittest.TestCase):
+    """Test the TerminalScreenBuffer class."""
+
+    def test_scroll_up(self):
+        """Test that line feeds past the last row scroll the screen."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=3, cols=10)
+
+        # Execute
+        buffer.process_data("one\r\ntwo\r\nthree\r\nfour")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "two\nthree\nfour")
+        self.assertEqual(len(buffer.screen), 3)
+        self.assertTrue(all(len(row) == 10 for row in buffer.screen))
+
+    def test_osc_sequences_are_skipped(self):
+        """Test that OSC sequences ended by BEL or ST leave nothing on screen."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=2, cols=10)
+
+        # Execute
+        buffer.process_data("\x1b]0;a title\x07ab\x1b]8;;http://x\x1b\\cd\x1b]8;;\x1b\\ef\x1b]0;cut")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "abcdef")
+        self.assertEqual(buffer.get_cursor_position(), (0, 6))
+
+    def test_wrap_long_run(self):
+        """Test that a run longer than the row wraps onto following rows."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=3, cols=4)
+
+        # Execute
+        buffer.process_data("ab\x1b[1;3Hcdefghij")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "abcd\nefgh\nij")
+        self.assertEqual(buffer.get_cursor_position(), (2, 2))
+        self.assertTrue(all(len(row) == 4 for row in buffer.screen))
+
+    def test_charset_designation(self):
+        """Test that charset designation sequences leave nothing on screen."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=2, cols=10)
+
+        # Execute
+        buffer.process_data("\x1b(Bok\x1b)0")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "ok")
+
+    def test_clear_line(self):
+        """Test erasing parts of the current line."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=2, cols=10)
+        buffer.process_data("abcdefgh")
+
+        # Execute
+        buffer.process_data("\x1b[1;4H\x1b[K")
+        buffer.process_data("\x1b[2D\x1b[1K")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "  c")
+
+    def test_clear_from_cursor_to_end(self):
+        """Test erasing from the cursor to the end of the screen."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=3, cols=10)
+        buffer.process_data("line1\r\nline2\r\nline3")
+
+        # Execute
+        buffer.process_data("\x1b[2;3H\x1b[J")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "line1\nli")
+        self.assertEqual(len(buffer.screen[1]), 10)
+
+
+    def test_truncated_and_unknown_csi_sequences(self):
+        """Test that CSI sequences are consumed whole, even when cut off or unknown."""
+        # Setup
+        buffer = TerminalScreenBuffer(rows=2, cols=10)
+
+        # Execute
+        buffer.process_data("a\x1b[1;31mb\x1b[?25lc\x1b[5")
+        buffer.process_data("d\x1b[2;3Xe")
+
+        # Assert
+        self.assertEqual(buffer.get_screen_content(), "abcde")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Tests for the terminal emulator session."""
+
+import time
+import unittest
+
+from terminal_mcp_server.terminal_emulator import TerminalEmulatorSession
+
+
+class TestTerminalEmulatorSession(unittest.TestCase):
+    """Test the TerminalEmulatorSession class."""
+
+    def test_start_returns_after_first_output(self):
+        """Test that startup returns once output has settled."""
+        # Execute
+        start = time.monotonic()
+        session = TerminalEmulatorSession("echo ready; sleep 5", dimensions=(5, 20))
+        elapsed = time.monotonic() - start
+        session.terminate()
+
+        # Assert
+        self.assertIn("ready", session.get_output())
+        self.assertLess(elapsed, 1)
+
+    def test_send_input(self):
+        """Test that input is echoed to the screen."""
+        # Setup
+        session = TerminalEmulatorSession("cat", dimensions=(5, 20))
+
+        # Execute
+        session.send_input("hello\n")
+        screen = session.get_screen_content()
+        session.terminate()
+
+        # Assert
+        self.assertEqual(screen.splitlines()[0], "hello")
+
+    def test_wait_for_idle(self):
+        """Test that waiting returns once output stops arriving."""
+        # Setup
+        session = TerminalEmulatorSession("sleep 0.3; echo late; sleep 5", dimensions=(5, 20))
+
+        # Execute
+        start = time.monotonic()
+        session.wait_for_idle(quiet=0.5, timeout=2)
+        elapsed = time.monotonic() - start
+        screen = session.get_screen_content()
+        session.terminate()
+
+        # Assert
+        self.assertIn("late", screen)
+        self.assertLess(elapsed, 1.5)
+
+    def test_character_split_across_reads(self):
+        """Test that a multi-byte character written in two parts is decoded whole."""
+        # Setup
+        session = TerminalEmulatorSession("printf '\\303'; sleep 0.3; printf '\\251\\n'; sleep 5", dimensions=(5, 20))
+
+        # Execute
+        session.wait_for_idle(quiet=0.5, timeout=2)
+        screen = session.get_screen_content()
+        session.terminate()
+
+        # Assert
+        self.assertEqual(screen.splitlines()[0], "é")
+
+    def test_raw_output_is_trimmed(self):
+        """Test that raw output accumulates and keeps only the most recent output."""
+        # Setup
+        session = TerminalEmulatorSession("head -c 60000 /dev/zero | tr '\\0' x; echo; echo end; sleep 5", dimensions=(5, 20))
+
+        # Execute
+        deadline = time.monotonic() + 5
+        while "end" not in session.output_buffer[-10:] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        output = session.get_output(raw=True)
+        session.terminate()
+
+        # Assert
+        self.assertIs(output, session.output_buffer)
+        self.assertLessEqual(len(output), 50000)
+        self.assertGreaterEqual(len(output), 40000)
+        self.assertTrue(output.rstrip().endswith("end"))
+
+
+if __name__ == "__main__":
+    unittest.main()
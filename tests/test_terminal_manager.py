@@ -1,20 +1,53 @@
 """Tests for the terminal manager."""
 
+import itertools
+import os
+import threading
 import time
 import unittest
 from unittest.mock import MagicMock, patch
 
-from terminal_mcp_server.terminal_manager import TerminalManager, TerminalSession
+from terminal_mcp_server.terminal_manager import (
+    FinishedSession, TerminalManager, TerminalSession, strip_ansi_escape_sequences
+)
+
+
+class TestStripAnsiEscapeSequences(unittest.TestCase):
+    """Test the strip_ansi_escape_sequences function."""
+
+    def test_strip(self):
+        """Test stripping escape sequences."""
+        self.assertEqual(strip_ansi_escape_sequences("\x1b[1;31mred\x1b[0m text"), "red text")
+    
+    def test_plain_text(self):
+        """Test that text without escapes is returned unchanged."""
+        text = "plain text"
+        self.assertIs(strip_ansi_escape_sequences(text), text)
 
 
 class TestTerminalSession(unittest.TestCase):
     """Test the TerminalSession class."""
 
+    def setUp(self):
+        """Create a pipe standing in for the PTY."""
+        self.read_fd, self.write_fd = os.pipe()
+    
+    def tearDown(self):
+        """Close the pipe."""
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+    
+    def _mock_process(self):
+        """Create a mock pexpect process reading from the pipe."""
+        mock_process = MagicMock()
+        mock_process.child_fd = self.read_fd
+        return mock_process
+
     @patch("pexpect.spawn")
     def test_init(self, mock_spawn):
         """Test initialization of a terminal session."""
         # Setup
-        mock_process = MagicMock()
+        mock_process = self._mock_process()
         mock_spawn.return_value = mock_process
         
         # Execute
@@ -32,9 +65,9 @@ class TestTerminalSession(unittest.TestCase):
     def test_send_input(self, mock_spawn):
         """Test sending input to a terminal session."""
         # Setup
-        mock_process = MagicMock()
+        mock_process = self._mock_process()
         mock_process.isalive.return_value = True
-        mock_process.before = "output after input"
+        mock_process.sendline.side_effect = lambda text: os.write(self.write_fd, b"output after input")
         mock_spawn.return_value = mock_process
         
         # Execute
@@ -43,7 +76,7 @@ class TestTerminalSession(unittest.TestCase):
         
         # Assert
         mock_process.sendline.assert_called_once_with("echo hello")
-        mock_process.expect.assert_called_once()
+        mock_process.expect.assert_not_called()
         self.assertEqual(output, "output after input")
         self.assertEqual(session.output_buffer, "output after input")
     
@@ -51,25 +84,87 @@ class TestTerminalSession(unittest.TestCase):
     def test_get_output(self, mock_spawn):
         """Test getting output from a terminal session."""
         # Setup
-        mock_process = MagicMock()
+        mock_process = self._mock_process()
         mock_process.isalive.return_value = True
-        mock_process.before = "some output"
         mock_spawn.return_value = mock_process
         
         # Execute
         session = TerminalSession("bash")
+        os.write(self.write_fd, b"some output")
         output = session.get_output()
         
         # Assert
-        mock_process.expect.assert_called_once()
+        mock_process.expect.assert_not_called()
         self.assertEqual(output, "some output")
-        self.assertEqual(session.output_buffer, "some output")
+        self.assertEqual(session.raw_output_buffer, "some output")
+    
+    @patch("pexpect.spawn")
+    def test_output_accumulates(self, mock_spawn):
+        """Test that output from successive reads is accumulated in order."""
+        # Setup
+        mock_process = self._mock_process()
+        mock_process.isalive.return_value = True
+        mock_spawn.return_value = mock_process
+        session = TerminalSession("bash", preserve_ansi=False)
+        
+        # Execute
+        for chunk in (b"one ", b"\x1b[1mtwo\x1b[0m ", b"three"):
+            os.write(self.write_fd, chunk)
+            session.get_output()
+        
+        # Assert
+        self.assertEqual(session.raw_output_buffer, "one \x1b[1mtwo\x1b[0m three")
+        self.assertEqual(session.output_buffer, "one two three")
+        self.assertEqual(session.get_output(), "one two three")
+    
+    @patch("pexpect.spawn")
+    def test_wait_for_output(self, mock_spawn):
+        """Test waiting for output that arrives after a delay."""
+        # Setup
+        mock_process = self._mock_process()
+        mock_process.isalive.return_value = True
+        mock_spawn.return_value = mock_process
+        session = TerminalSession("bash")
+        timer = threading.Timer(0.1, os.write, (self.write_fd, b"late output"))
+        
+        # Execute
+        start = time.monotonic()
+        timer.start()
+        output = session.wait_for_output(timeout=2)
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        self.assertEqual(output, "late output")
+        self.assertEqual(session.raw_output_buffer, "late output")
+        self.assertLess(elapsed, 1)
+    
+    @patch("pexpect.spawn")
+    def test_wait_for_idle(self, mock_spawn):
+        """Test waiting until output stops arriving."""
+        # Setup
+        mock_process = self._mock_process()
+        mock_process.isalive.return_value = True
+        mock_spawn.return_value = mock_process
+        session = TerminalSession("bash")
+        timers = [threading.Timer(delay, os.write, (self.write_fd, chunk))
+                  for delay, chunk in ((0.02, b"one "), (0.08, b"two "), (0.14, b"three"))]
+        
+        # Execute
+        start = time.monotonic()
+        for timer in timers:
+            timer.start()
+        output = session.wait_for_idle(quiet=0.1, timeout=2)
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        self.assertEqual(output, "one two three")
+        self.assertLess(elapsed, 1)
     
     @patch("pexpect.spawn")
     def test_is_running(self, mock_spawn):
         """Test checking if a terminal session is running."""
         # Setup
-        mock_process = MagicMock()
+        mock_process = self._mock_process()
         mock_process.isalive.return_value = True
         mock_spawn.return_value = mock_process
         
@@ -85,16 +180,38 @@ class TestTerminalSession(unittest.TestCase):
     def test_terminate(self, mock_spawn):
         """Test terminating a terminal session."""
         # Setup
-        mock_process = MagicMock()
-        mock_process.isalive.side_effect = [True, False]  # First call returns True, second call returns False
+        mock_process = self._mock_process()
+        # Alive for the first two checks, then exits after SIGTERM
+        mock_process.isalive.side_effect = itertools.chain([True, True], itertools.repeat(False))
         mock_spawn.return_value = mock_process
         
         # Execute
         session = TerminalSession("bash")
+        start = time.monotonic()
         session.terminate()
+        elapsed = time.monotonic() - start
         
         # Assert
         mock_process.terminate.assert_called_once_with(force=False)
+        self.assertLess(elapsed, 0.5)
+    
+    @patch("pexpect.spawn")
+    def test_terminate_exited_process(self, mock_spawn):
+        """Test that terminating an exited session still releases its selector."""
+        # Setup
+        mock_process = self._mock_process()
+        mock_process.isalive.return_value = False
+        mock_process.exitstatus = 0
+        mock_spawn.return_value = mock_process
+        session = TerminalSession("bash")
+        
+        # Execute
+        session.terminate()
+        
+        # Assert
+        mock_process.terminate.assert_not_called()
+        self.assertIsNone(session._selector.get_map())
+        self.assertEqual(session.exit_code, 0)
 
 
 class TestTerminalManager(unittest.TestCase):
@@ -128,12 +245,92 @@ class TestTerminalManager(unittest.TestCase):
         output, exit_code, running = manager.run_command("echo hello", "test-session")
         
         # Assert
-        mock_terminal_session.assert_called_once_with("echo hello", 30)
+        mock_terminal_session.assert_called_once_with(
+            "echo hello", 30, term_type="xterm-256color", preserve_ansi=True
+        )
+        mock_session.wait_for_output.assert_called_once_with(timeout=2)
         self.assertEqual(output, "command output")
         self.assertIsNone(exit_code)
         self.assertTrue(running)
         self.assertIn("test-session", manager.sessions)
     
+    def test_run_command_returns_on_exit(self):
+        """Test that a quick command returns as soon as it exits."""
+        # Setup
+        manager = TerminalManager()
+        
+        # Execute
+        start = time.monotonic()
+        output, exit_code, running = manager.run_command("echo hello", "test-session")
+        elapsed = time.monotonic() - start
+        manager.cleanup()
+        
+        # Assert
+        self.assertIn("hello", output)
+        self.assertLess(elapsed, 0.5)
+    
+    @patch("terminal_mcp_server.terminal_manager.TerminalSession")
+    def test_run_command_non_interactive(self, mock_terminal_session):
+        """Test running a one-shot command without a PTY."""
+        # Setup
+        manager = TerminalManager()
+        
+        # Execute
+        output, exit_code, running = manager.run_command(
+            "echo hello", "test-session", interactive=False
+        )
+        
+        # Assert
+        mock_terminal_session.assert_not_called()
+        self.assertEqual(output, "hello\n")
+        self.assertEqual(exit_code, 0)
+        self.assertFalse(running)
+        self.assertIsInstance(manager.sessions["test-session"], FinishedSession)
+    
+    def test_run_command_passes_session_options(self):
+        """Test that run_command passes TERM and preserve_ansi to one-shot commands."""
+        # Setup
+        manager = TerminalManager()
+        
+        # Execute
+        output, exit_code, running = manager.run_command(
+            "printf '\\033[1m%s\\033[0m' \"$TERM\"", "test-session", interactive=False,
+            term_type="vt100", preserve_ansi=False
+        )
+        
+        # Assert
+        self.assertEqual(output, "vt100")
+    
+    def test_non_interactive_command_environment(self):
+        """Test that one-shot commands see the same TERM as PTY sessions."""
+        # Execute
+        session = FinishedSession("echo $TERM")
+        
+        # Assert
+        self.assertEqual(session.get_output(), "xterm-256color\n")
+    
+    def test_non_interactive_timeout_kills_process_group(self):
+        """Test that a timed out one-shot command leaves no processes behind."""
+        # Setup
+        marker = f"{os.getpid()}{time.monotonic_ns()}"
+        
+        # Execute
+        session = FinishedSession(f"echo started; sleep {marker} & wait", timeout=1)
+        time.sleep(0.1)
+        
+        # Assert
+        self.assertEqual(session.exit_code, -1)
+        self.assertEqual(session.get_output(), "started\n")
+        leftover = []
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    if marker.encode() in f.read():
+                        leftover.append(pid)
+            except OSError:
+                pass
+        self.assertEqual(leftover, [])
+    
     @patch("terminal_mcp_server.terminal_manager.TerminalSession")
     def test_send_input(self, mock_terminal_session):
         """Test sending input to a session."""
@@ -178,6 +375,50 @@ class TestTerminalManager(unittest.TestCase):
         self.assertIsNone(exit_code)
         self.assertTrue(running)
     
+    def test_wait_for_idle(self):
+        """Test that waiting for a session returns once its output settles."""
+        # Setup
+        manager = TerminalManager()
+        manager.run_command("cat", "test-session")
+        manager.sessions["test-session"].process.sendline("hello")
+        
+        # Execute
+        start = time.monotonic()
+        output, exit_code, running = manager.wait_for_idle("test-session", timeout=2)
+        elapsed = time.monotonic() - start
+        manager.cleanup()
+        
+        # Assert
+        self.assertIn("hello", output)
+        self.assertIsNone(exit_code)
+        self.assertTrue(running)
+        self.assertLess(elapsed, 1)
+    
+    def test_get_session_state_raw(self):
+        """Test that the raw override is passed to sessions that support it."""
+        # Setup
+        mock_session = MagicMock()
+        mock_session._supports_raw_kwarg = True
+        mock_session.get_output.return_value = "raw output"
+        legacy_session = MagicMock(spec=["get_output", "exit_code", "is_running"])
+        legacy_session.get_output.return_value = "plain output"
+        legacy_session.exit_code = 0
+        legacy_session.is_running.return_value = False
+        
+        manager = TerminalManager()
+        manager.sessions["test-session"] = mock_session
+        manager.sessions["legacy-session"] = legacy_session
+        
+        # Execute
+        output, _, _ = manager.get_session_state("test-session", raw_output=True)
+        legacy_output, _, _ = manager.get_session_state("legacy-session", raw_output=True)
+        
+        # Assert
+        mock_session.get_output.assert_called_once_with(raw=True)
+        legacy_session.get_output.assert_called_once_with()
+        self.assertEqual(output, "raw output")
+        self.assertEqual(legacy_output, "plain output")
+    
     @patch("terminal_mcp_server.terminal_manager.TerminalSession")
     def test_terminate_session(self, mock_terminal_session):
         """Test terminating a session."""
@@ -213,3 +454,22 @@ class TestTerminalManager(unittest.TestCase):
         self.assertEqual(len(sessions), 2)
         self.assertIn("test-session-1", sessions)
         self.assertIn("test-session-2", sessions)
+    
+    def test_cleanup(self):
+        """Test cleaning up all sessions."""
+        # Setup
+        mock_session_1 = MagicMock()
+        mock_session_2 = MagicMock()
+        mock_session_2.terminate.side_effect = RuntimeError("already gone")
+        
+        manager = TerminalManager()
+        manager.sessions["test-session-1"] = mock_session_1
+        manager.sessions["test-session-2"] = mock_session_2
+        
+        # Execute
+        manager.cleanup()
+        
+        # Assert
+        mock_session_1.terminate.assert_called_once()
+        mock_session_2.terminate.assert_called_once()
+        self.assertEqual(manager.sessions, {})